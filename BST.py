@@ -7,15 +7,17 @@ class Node(object):
 
     Attributes:
         key = the key contained in this node
+        value = the item contained in this node, for trees with a key function; the tree sets key = key function(value) on insert
         parent = the node's parent
         left = the node's left child
         right = the node's right child
         height = the node's height in the tree, where leaf.height = 0; for use in AVL trees
     """
     
-    def __init__(self, k = None):
-        """ Initializes a new Node, with optional key k. """
+    def __init__(self, k = None, value = None):
+        """ Initializes a new Node, with optional key k and optional value (for trees with a key function). """
         self.key = k
+        self.value = value
         self.parent = None
         self.left = None
         self.right = None
@@ -37,17 +39,24 @@ class BST(object):
 
     Builds and maintains a tree of Nodes from given keys. This class is not self-balancing but subclasses can be.
     Representation invariant is that, for all nodes, key of the left child <= node's key <= key of the right child.
+    With a key function, Nodes are created with a value (Node(value = item)) and the tree computes node.key once on insert,
+    so the walks compare the raw keys directly. search() still takes a key, and inorderWalk() returns the values.
 
     Attributes:
         _r = root node of the search tree
+        _key = key function applied to each Node's value on insert, or None if Nodes are given their keys directly
     """
     
-    def __init__(self):
-        """ Initializes an empty BST. """
+    def __init__(self, key = None):
+        """ Initializes an empty BST, with optional key function. """
         self._r = None
+        self._key = key
 
     def insert(self, new):
         """ Inserts a new Node into the tree. Duplicate keys are ignored. """
+        if self._key is not None:
+            new.key = self._key(new.value)
+
         node = self._r
         
         if node == None:
@@ -148,7 +157,7 @@ class BST(object):
             return p
 
     def inorderWalk(self):
-        """ Returns an (sorted) array of elements from an in-order walk of the BST. """
+        """ Returns an (sorted) array of elements from an in-order walk of the BST. These are the keys, or the values with a key function. """
         arr = []
         self._subtreeWalk(self._r, arr)
         return arr
@@ -182,7 +191,8 @@ class BST(object):
         if not node: return
         else:
             self._subtreeWalk(node.left, arr)
-            arr.append(node.key)
+            if self._key is None: arr.append(node.key)
+            else: arr.append(node.value)
             self._subtreeWalk(node.right, arr)
     
     def _transplant(self, n1, n2):
@@ -1,14 +1,20 @@
+from array import array
 import random
 
 class HashFunction(object):
     """ Simple hash function, for use with hash tables.
 
-    Calculates a hash in the form ((ak + b) mod p) mod m.
-    Create with a desired m = hash table size, and call h(k) to hash a given key k.
+    Calculates a hash in the form ((ax + b) mod p) mod m, where x = hash(k) mod p, so keys can be any hashable objects (ints hash to themselves).
+    Create with a desired m = hash table size, and call h(k) to hash a given key k, or hMany(keys) to hash many keys at once.
+    The full hash x does not depend on m, a or b: tables can store fullHash(k) for each entry and find its slot with slot(full_hash).
+    resized(m) returns a function for a new size with new random a and b, so a table can be rebuilt without hashing any key again.
     Meant to be immutable once created. A new instance should be created for new m.
+    The prime p depends only on the universe size d, so it is found once per d and cached; the prime for the default d is precomputed.
+    Creating a hash function then only draws a and b.
     
     Attributes:
-        (class) d = size of the universe of keys
+        (class) d = default size of the universe of keys
+        (class) _primes = dict of universe size -> the smallest prime greater than it, shared by all instances
         _m = size of the hash table
         _p = prime between d and 2*d
         _a = random number between [1,_p - 1]
@@ -16,33 +22,79 @@ class HashFunction(object):
     """
 
     d = 2**31-1
+    _primes = {2**31-1: 2147483659}
 
-    def __init__(self, m):
-        """ Initializes the instance with parameter m, the size of the hash table. """
+    # Miller-Rabin with the primes up to 41 as bases is deterministic for all n < 3317044064679887385961981 (about 3.3 * 10**24)
+    _bases = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+    def __init__(self, m, d = None):
+        """ Initializes the instance with parameter m, the size of the hash table, and optionally d, the size of the universe of keys. """
+        if d is None: d = HashFunction.d
         self._m = m
-        self._p = HashFunction._findPrime(HashFunction.d)
+        self._p = HashFunction._findPrime(d)
         self._a = random.randint(1,self._p-1)
         self._b = random.randint(0,self._p-1)
         
     def h(self, k):
-        """ Returns the hash value for a given input key k. """
-        return ((self._a * k + self._b) % self._p) % self._m
+        """ Returns the hash value (slot) for a given input key k. """
+        return ((self._a * (hash(k) % self._p) + self._b) % self._p) % self._m
+
+    def hMany(self, keys):
+        """ Returns a list with the hash value of every key in an iterable, in one pass with the parameters bound locally. """
+        a, b, p, m = self._a, self._b, self._p, self._m
+        return [((a * (hash(k) % p) + b) % p) % m for k in keys]
+
+    def fullHash(self, k):
+        """ Returns the full hash of a given key k, hash(k) mod p, which is the same for every table size. """
+        return hash(k) % self._p
+
+    def slot(self, full_hash):
+        """ Returns the hash value (slot) for a key with the given full hash. """
+        return ((self._a * full_hash + self._b) % self._p) % self._m
+
+    def resized(self, m):
+        """ Returns a hash function for table size m with the same prime, so full hashes stay valid, and new random a and b. """
+        h = HashFunction.__new__(HashFunction)
+        h._m = m
+        h._p = self._p
+        h._a = random.randint(1,h._p-1)
+        h._b = random.randint(0,h._p-1)
+        return h
 
     @classmethod
     def _findPrime(cls, n):
-        """ Finds a prime, using brute force, greater than n. """
+        """ Returns the smallest prime greater than n, from the cache if it has been found before. """
+        p = cls._primes.get(n)
+        if p is not None: return p
+
         t = max(3, n+1)
         if t % 2 == 0: t += 1
         while not cls._isPrime(t):
             t += 2
+        cls._primes[n] = t
         return t
 
     @classmethod
     def _isPrime(cls, n):
-        """ Determines whether a given integer n is prime or not. """
-        if n == 1: return False
-        for i in range(2,int(n**0.5)+1):
-            if n % i == 0: return False
+        """ Determines whether a given integer n is prime or not, with Miller-Rabin over fixed bases. Deterministic for n < 3.3 * 10**24. """
+        if n < 2: return False
+        for q in cls._bases:
+            if n % q == 0: return n == q
+
+        # n - 1 = d * 2**s, with d odd
+        d, s = n - 1, 0
+        while d % 2 == 0:
+            d //= 2
+            s += 1
+
+        for a in cls._bases:
+            x = pow(a, d, n)
+            if x == 1 or x == n - 1: continue
+            for r in range(s - 1):
+                x = x * x % n
+                if x == n - 1: break
+            else:
+                return False
         return True
 
     def __str__(self):
@@ -56,13 +108,15 @@ class LinkedList(object):
         prev = previous element in the list
         next = next element in the list
         value = value for this element in the list
+        hash = full hash of the value's key, cached by hash tables, or None
     """
 
-    def __init__(self, v = None):
-        """ Initializes a linked list with an optional given value. """
+    def __init__(self, v = None, h = None):
+        """ Initializes a linked list with an optional given value and cached hash. """
         self.prev = None
         self.next = None
         self.value = v
+        self.hash = h
 
     def search(self, target):
         """ Searches the linked list started at this element for a given target value. """
@@ -77,6 +131,10 @@ class LinkedList(object):
         ar.append(self.value)
         if self.next: self.next.asArray(ar)
 
+    def __nonzero__(self):
+        """ Returns True: an element is always true, so tests like "while l" take O(1) instead of calling __len__ on the rest of the list. """
+        return True
+
     def __len__(self):
         """ Returns the length of the list starting at this element. """
         if not self.next: return 1
@@ -142,47 +200,113 @@ class KeyValuePair(object):
         """ Returns a string representation of the KVP. """
         return "[" +str(self.key)+","+str(self.value)+"]"
     
+_LONG_MAX = 2**(8*array('l').itemsize-1)-1  # largest value a typed array of C longs can hold
+_EMPTY = object()    # marks a never-used slot in an OpenHashTable
+_DELETED = object()  # marks a tombstone, left by a delete, in an OpenHashTable
+
 class HashTable(object):
     """ Implementation of a hash table / dictionary, comparable to the built-in dict. Uses chaining.
 
     Supports lookup and insert in O(1) amortized. Uses table doubling / halving to grow and shrink the table, as requried.
+    Keys can be any hashable objects. Each chain node caches the full hash of its key: searches compare keys only when the hashes
+    match, and rebuilds never hash a key again.
+    Sizes are powers of two, never below min_size. A shrink goes straight to the size where the load is at most max_load / 2, and a
+    grow halves the load; alternating inserts and deletes cannot make the table resize back and forth as long as min_load stays
+    below the lowest load a grow can leave (just above max_load / 2 here; max_load / 4 for OpenHashTable). fromItems, update and reserve size the table once for a known number of entries; reserve also stops the table from
+    shrinking below that size until shrinkToFit is called.
     Direct modification of the values or counts is not supported. Use insert() and delete() instead.
 
     Attributes:
         (class) max_load = maximum load before the table grows
-        (class) min_load = minimum load before the table shrinks; should be smaller than max_load to function properly
+        (class) min_load = minimum load before the table shrinks; at most max_load / 4 to function properly
+        (class) min_size = size below which the table never shrinks; a power of two
         _n = number of distinct elements stored in the table
         _m = current size of the array
+        _reserved = number of entries reserved with reserve(); the table does not shrink below the size for it
         _h = hash function
         _v = the array storing linked lists at each hash value
     """
 
     max_load = 1.00
     min_load = 0.25
+    min_size = 8
 
     def __init__(self):
         """ Initializes an empty hash table. """
         self._n = 0
-        self._m = 8
+        self._m = self.min_size
+        self._reserved = 0
         self._h = HashFunction(self._m)
         self._v = [None] * self._m
 
+    @classmethod
+    def fromItems(cls, items, expected_size = None):
+        """ Creates a table from an iterable of (key, value) pairs, or a dict or HashTable. With expected_size (or a sized input),
+        the array is sized once up front, so there are no rebuilds while loading. Later pairs overwrite earlier ones with the same key.
+        """
+        table = cls()
+        if expected_size is not None:
+            table._rebuild(table._sizeFor(expected_size))
+        table.update(items)
+        return table
+
+    def update(self, items):
+        """ Inserts every (key, value) pair from an iterable, or every entry of a dict or HashTable, overwriting existing keys.
+        If the number of pairs is known, the table grows at most once, to fit all of them, before inserting.
+        """
+        if isinstance(items, HashTable):
+            items = [(kvp.key, kvp.value) for kvp in items._kvps()]
+        elif isinstance(items, dict):
+            items = items.items()
+
+        if hasattr(items, "__len__"):
+            m = self._sizeFor(self._n + len(items))
+            if m > self._m:
+                self._rebuild(m)
+
+        for k, v in items:
+            self.insert(k, v)
+
+    def reserve(self, n):
+        """ Makes room for n entries in total, so the table does not grow until it holds more than n entries,
+        and does not shrink below that size until shrinkToFit is called.
+        """
+        self._reserved = n
+        m = self._sizeFor(n)
+        if m > self._m:
+            self._rebuild(m)
+
+    def shrinkToFit(self):
+        """ Drops any reservation and rebuilds the table at the smallest size that holds its entries without growing. """
+        self._reserved = 0
+        m = self._sizeFor(self._n)
+        if m < self._m:
+            self._rebuild(m)
+
     def insert(self, k, v):
         """ Inserts a value into the hash table, keyed with the given key. If the key already exists in the hash table, the value is overwritten. """
-        h = self._h.h(k)
+        self._insert(k, v, self._h.fullHash(k))
+
+    def delete(self, k):
+        """ Deletes an entry in the hash table at a given key. If no such element exists, this does nothing. """
+        self._delete(k, self._h.fullHash(k))
+
+    def _insert(self, k, v, f):
+        """ Inserts a value keyed with key k, whose full hash f is already computed. """
+        h = self._h.slot(f)
         l = self._v[h]
 
         if not l:
-            self._v[h] = LinkedList(KeyValuePair(k,v))
+            self._v[h] = LinkedList(KeyValuePair(k,v), f)
         else:
             p = l.prev
             while l:
-                if l.value.key == k:
+                if l.hash == f and l.value.key == k:
                     l.value.value = v
                     return
                 p, l = l, l.next
 
-            new = LinkedList(KeyValuePair(k,v))
+            new = LinkedList(KeyValuePair(k,v), f)
             p.next = new
             new.prev = p
             
@@ -191,9 +315,9 @@ class HashTable(object):
         if self.load() > self.max_load:
             self._grow()
 
-    def delete(self, k):
-        """ Deletes an entry in the hash table at a given key. If no such element exists, this does nothing. """
-        h = self._h.h(k)
+    def _delete(self, k, f):
+        """ Deletes the entry with key k, whose full hash f is already computed. If no such element exists, this does nothing. """
+        h = self._h.slot(f)
         l = self._v[h]
 
         if not l:
@@ -201,7 +325,7 @@ class HashTable(object):
         else:
             p = l.prev
             while l:
-                if l.value.key == k:
+                if l.hash == f and l.value.key == k:
                     if p:
                         p.next = l.next
                         if l.next:
@@ -226,43 +350,59 @@ class HashTable(object):
         self._rebuild(self._m*2)   
     
     def _shrink(self):
-        """ Halves the current size of the array storing the hash table. """
-        self._rebuild(self._m/2) 
+        """ Shrinks the array storing the hash table to the size where the load is at most max_load / 2, but not below min_size or the reserved size. """
+        m = self._sizeFor(max(2 * self._n, self._reserved))
+        if m < self._m:
+            self._rebuild(m)
+
+    def _sizeFor(self, n):
+        """ Returns the smallest size, a power of two no smaller than min_size, that holds n entries with load at most max_load. """
+        m = self.min_size
+        while n > self.max_load * m:
+            m *= 2
+        return m
 
     def _rebuild(self,new_m):
-        """ Rebuilds the array storing the hash table, at a given size new_m. """
-        kvps = self._kvps()
+        """ Rebuilds the array storing the hash table, at a given size new_m. Relinks the existing nodes by their cached full hashes, so no key is hashed or compared. """
+        nodes = []
+        for l in self._v:
+            while l:
+                nodes.append(l)
+                l = l.next
 
-        self._n = 0
         self._m = new_m
-        self._h = HashFunction(self._m)
+        self._h = self._h.resized(self._m)
         self._v = [None] * self._m
 
-        for kvp in kvps:
-            self.insert(kvp.key,kvp.value)  
+        for node in nodes:
+            h = self._h.slot(node.hash)
+            node.prev = None
+            node.next = self._v[h]
+            if node.next: node.next.prev = node
+            self._v[h] = node
 
     def lookup(self, k):
         """ Returns the value associated with key k, or None if no such value exists. """
-        h = self._h.h(k)
-        l = self._v[h]
+        f = self._h.fullHash(k)
+        l = self._v[self._h.slot(f)]
 
         if not l: return None
         
         while l:
-            if l.value.key == k:
+            if l.hash == f and l.value.key == k:
                 return l.value.value
             l = l.next
         return None
 
     def contains(self, k):
         """ Returns True if the key k is in the hash table, and False otherwise. """
-        h = self._h.h(k)
-        l = self._v[h]
+        f = self._h.fullHash(k)
+        l = self._v[self._h.slot(f)]
 
         if not l: return False
         
         while l:
-            if l.value.key == k:
+            if l.hash == f and l.value.key == k:
                 return True    
             l = l.next
         return False
@@ -332,3 +472,325 @@ class HashTable(object):
                 s += ", "
         s += "}"
         return s
+
+
+class IncrementalHashTable(HashTable):
+    """ Hash table / dictionary using chaining, which resizes incrementally. Inherits from HashTable, with the same API.
+
+    HashTable rebuilds the whole table in one insert or delete when the load crosses max_load or min_load, which takes O(n).
+    Here a resize only allocates the new bucket array; the old array is kept, and every following insert and delete moves
+    a step of old buckets (plus the old bucket of the key it touches) into the new array, relinking the existing nodes.
+    Lookups check the new array and then the old one until the migration finishes. The step is migrate_buckets, or more if the old
+    array would not be fully moved by then in the fewest inserts or deletes that can trigger the next resize, so a migration always
+    finishes before the next resize is due. After a grow or a shrink at min_load this is at most 8 buckets, so the only O(m) work
+    left in those resizes is allocating the new array. shrinkToFit, whose old array can be any size and which can leave the table
+    one insert away from a grow, finishes its resize in the call, like reserve allocates its array in the call.
+
+    Attributes:
+        (class) migrate_buckets = minimum number of old buckets moved on each insert or delete during a migration
+        _old = the old array of linked lists being migrated, or None if no resize is in progress
+        _old_h = hash function of the old array, or None
+        _migrated = number of old buckets moved so far
+        _step = number of old buckets moved on each insert or delete during the current migration
+    """
+
+    migrate_buckets = 8
+
+    def __init__(self):
+        """ Initializes an empty hash table. """
+        super(IncrementalHashTable, self).__init__()
+        self._old = None
+        self._old_h = None
+        self._migrated = 0
+        self._step = self.migrate_buckets
+
+    def shrinkToFit(self):
+        """ Drops any reservation and rebuilds the table at the smallest size that holds its entries, finishing the resize in this call. """
+        super(IncrementalHashTable, self).shrinkToFit()
+        if self._old is not None:
+            self._finishMigration()
+
+    def _insert(self, k, v, f):
+        """ Inserts a value keyed with key k, whose full hash f is already computed, after a migration step. """
+        self._migrateFor(f)
+        super(IncrementalHashTable, self)._insert(k, v, f)
+        self.__checkRep()
+
+    def _delete(self, k, f):
+        """ Deletes the entry with key k, whose full hash f is already computed, after a migration step. """
+        self._migrateFor(f)
+        super(IncrementalHashTable, self)._delete(k, f)
+        self.__checkRep()
+
+    def lookup(self, k):
+        """ Returns the value associated with key k, or None if no such value exists. """
+        l = self._node(k)
+        if l: return l.value.value
+        else: return None
+
+    def contains(self, k):
+        """ Returns True if the key k is in the hash table, and False otherwise. """
+        return self._node(k) is not None
+
+    def resizing(self):
+        """ Returns True if a resize is in progress, with entries still in the old array. """
+        return self._old is not None
+
+    def _node(self, k):
+        """ Returns the linked list node holding key k, searching the new array and then the old one, or None if the key is not in the table. """
+        f = self._h.fullHash(k)
+        l = self._v[self._h.slot(f)]
+        while l:
+            if l.hash == f and l.value.key == k: return l
+            l = l.next
+
+        if self._old is not None:
+            l = self._old[self._old_h.slot(f)]
+            while l:
+                if l.hash == f and l.value.key == k: return l
+                l = l.next
+        return None
+
+    def _rebuild(self, new_m):
+        """ Starts resizing to a given size new_m: allocates the new array and keeps the current one for migration,
+        with a step that moves all of it before the next resize can be due.
+        """
+        if self._old is not None:
+            self._finishMigration()
+
+        # fewest inserts or deletes before the load can cross max_load, or min_load if the table may shrink at this size
+        ops = int(self.max_load * new_m - self._n) + 1
+        if new_m > self._sizeFor(self._reserved):
+            ops = min(ops, int(self._n - self.min_load * new_m) + 1)
+        ops = max(ops, 1)
+
+        self._old = self._v
+        self._old_h = self._h
+        self._migrated = 0
+        self._step = max(self.migrate_buckets, (len(self._old) + ops - 1) // ops)
+        self._m = new_m
+        self._h = self._h.resized(new_m)
+        self._v = [None] * new_m
+
+    def _migrateFor(self, f):
+        """ During a resize, moves the old bucket of the key with full hash f (so the key is only in the new array), then the next _step buckets. """
+        if self._old is None: return
+
+        self._migrateBucket(self._old_h.slot(f))
+        end = min(self._migrated + self._step, len(self._old))
+        while self._migrated < end:
+            self._migrateBucket(self._migrated)
+            self._migrated += 1
+        if self._migrated == len(self._old):
+            self._old = None
+            self._old_h = None
+
+    def _finishMigration(self):
+        """ Moves all remaining old buckets into the new array. """
+        for i in range(self._migrated, len(self._old)):
+            self._migrateBucket(i)
+        self._old = None
+        self._old_h = None
+
+    def _migrateBucket(self, i):
+        """ Moves every node of old bucket i to the front of its bucket in the new array, reusing the nodes and their cached hashes. """
+        l = self._old[i]
+        self._old[i] = None
+        while l:
+            nxt = l.next
+            h = self._h.slot(l.hash)
+            l.prev = None
+            l.next = self._v[h]
+            if l.next: l.next.prev = l
+            self._v[h] = l
+            l = nxt
+
+    def _kvps(self):
+        """ Returns an array with all the KeyValuePairs currently stored in the hash table, in both arrays during a resize. """
+        kvps = super(IncrementalHashTable, self)._kvps()
+        if self._old is not None:
+            for l in self._old:
+                if l: l.asArray(kvps)
+        return kvps
+
+    def __checkRep(self):
+        """ Checks the rep invariant: every node is in the bucket of its hash, and the node count matches _n. For debugging. """
+        if False: # set to True for debugging
+            count = 0
+            for table, h in [(self._v, self._h), (self._old, self._old_h)]:
+                if table is None: continue
+                for i, l in enumerate(table):
+                    while l:
+                        count += 1
+                        if l.hash != h.fullHash(l.value.key) or h.slot(l.hash) != i:
+                            print "Rep Invariant Error, key =", l.value.key, "in bucket", i, "hashes to", h.h(l.value.key), ", cached hash =", l.hash
+                        l = l.next
+            if count != self._n:
+                print "Rep Invariant Error, n =", self._n, "nodes =", count
+
+class OpenHashTable(HashTable):
+    """ Hash table / dictionary using open addressing with linear probing over flat parallel arrays. Inherits from HashTable, with the same API.
+
+    Each entry takes one slot in three arrays: keys, values and hashes, so there is no LinkedList or KeyValuePair object per entry.
+    Keys can be any hashable objects. A key lives in the first free slot at or after its hash value, wrapping around. Deleting leaves a tombstone, so probes for other keys
+    continue past it; inserts reuse the first tombstone they pass. Comparing stored hashes first avoids most key comparisons while probing.
+    The table is rebuilt when live entries plus tombstones exceed max_load, growing it if the live entries alone are at least half of that.
+
+    Attributes:
+        (class) max_load = maximum fraction of used (live or tombstone) slots before the table is rebuilt; must be below 1
+        (class) min_load = minimum load before the table shrinks; must be below max_load / 4, the lowest load right after a grow,
+                           or deletes right after a grow shrink the table straight back
+        _n = number of live entries
+        _m = number of slots
+        _deleted = number of tombstones
+        _h = hash function
+        _keys = list of keys, with _EMPTY for empty slots and _DELETED for tombstones
+        _vals = list of values, parallel to _keys
+        _hashes = array of the full hash of each key, parallel to _keys; a typed array when the hashes fit in a C long
+    """
+
+    max_load = 0.6
+    min_load = 0.1
+
+    def __init__(self):
+        """ Initializes an empty hash table. """
+        self._n = 0
+        self._m = self.min_size
+        self._reserved = 0
+        self._deleted = 0
+        self._h = HashFunction(self._m)
+        self._keys = [_EMPTY] * self._m
+        self._vals = [None] * self._m
+        self._hashes = self._newHashes(self._m)
+
+    def insert(self, k, v):
+        """ Inserts a value into the hash table, keyed with the given key. If the key already exists in the hash table, the value is overwritten. """
+        f = self._h.fullHash(k)
+        keys, hashes = self._keys, self._hashes
+        m = self._m
+        i = self._h.slot(f)
+        free = -1
+        while True:
+            key = keys[i]
+            if key is _EMPTY:
+                break
+            elif key is _DELETED:
+                if free < 0: free = i
+            elif hashes[i] == f and key == k:
+                self._vals[i] = v
+                return
+            i += 1
+            if i == m: i = 0
+
+        if free >= 0:
+            i = free
+            self._deleted -= 1
+        keys[i] = k
+        self._vals[i] = v
+        hashes[i] = f
+        self._n += 1
+
+        if self._n + self._deleted > self.max_load * m:
+            if 2 * self._n >= self.max_load * m:
+                self._grow()
+            else:
+                self._rebuild(m)
+        self.__checkRep()
+
+    def delete(self, k):
+        """ Deletes an entry in the hash table at a given key, leaving a tombstone. If no such element exists, this does nothing. """
+        i = self._find(k)
+        if i < 0: return
+
+        self._keys[i] = _DELETED
+        self._vals[i] = None
+        self._n -= 1
+        self._deleted += 1
+
+        if self.load() < self.min_load:
+            self._shrink()
+        self.__checkRep()
+
+    def lookup(self, k):
+        """ Returns the value associated with key k, or None if no such value exists. """
+        i = self._find(k)
+        if i < 0: return None
+        else: return self._vals[i]
+
+    def contains(self, k):
+        """ Returns True if the key k is in the hash table, and False otherwise. """
+        return self._find(k) >= 0
+
+    def values(self):
+        """ Returns an array representing all the values currently stored in the hash table. """
+        return [self._vals[i] for i, key in enumerate(self._keys) if key is not _EMPTY and key is not _DELETED]
+
+    def keys(self):
+        """ Returns an array representing all the keys currently stored in the hash table. """
+        return [key for key in self._keys if key is not _EMPTY and key is not _DELETED]
+
+    def _find(self, k):
+        """ Returns the slot holding key k, or -1 if the key is not in the table. """
+        f = self._h.fullHash(k)
+        keys, hashes = self._keys, self._hashes
+        m = self._m
+        i = self._h.slot(f)
+        while True:
+            key = keys[i]
+            if key is _EMPTY:
+                return -1
+            elif hashes[i] == f and key is not _DELETED and key == k:
+                return i
+            i += 1
+            if i == m: i = 0
+
+    def _rebuild(self, new_m):
+        """ Rebuilds the arrays storing the hash table at a given size new_m, dropping all tombstones. Reuses the stored full hashes. """
+        entries = [(key, self._vals[i], self._hashes[i]) for i, key in enumerate(self._keys) if key is not _EMPTY and key is not _DELETED]
+
+        self._m = new_m
+        self._deleted = 0
+        self._h = self._h.resized(new_m)
+        keys = self._keys = [_EMPTY] * new_m
+        vals = self._vals = [None] * new_m
+        hashes = self._hashes = self._newHashes(new_m)
+
+        # every key is distinct and there are no tombstones, so each entry goes into the first empty slot
+        slot = self._h.slot
+        for k, v, f in entries:
+            i = slot(f)
+            while keys[i] is not _EMPTY:
+                i += 1
+                if i == new_m: i = 0
+            keys[i] = k
+            vals[i] = v
+            hashes[i] = f
+
+    def _newHashes(self, m):
+        """ Returns a zeroed array of m full hashes: a typed array of C longs if the hash function's prime fits, and a list otherwise. """
+        if self._h._p <= _LONG_MAX:
+            return array('l', [0]) * m
+        else:
+            return [0] * m
+
+    def _kvps(self):
+        """ Returns an array with a KeyValuePair for every entry currently stored in the hash table. """
+        return [KeyValuePair(key, self._vals[i]) for i, key in enumerate(self._keys) if key is not _EMPTY and key is not _DELETED]
+
+    def __checkRep(self):
+        """ Checks the rep invariant: the counts match the slots, and every key is reachable from its hash without crossing an empty slot. For debugging. """
+        if False: # set to True for debugging
+            live = len(self.keys())
+            dead = sum(1 for key in self._keys if key is _DELETED)
+            if live != self._n or dead != self._deleted:
+                print "Rep Invariant Error, n =", self._n, "live =", live, ", deleted =", self._deleted, "tombstones =", dead
+            for i, key in enumerate(self._keys):
+                if key is _EMPTY or key is _DELETED: continue
+                if self._hashes[i] != self._h.fullHash(key):
+                    print "Rep Invariant Error, key =", key, "at slot", i, "has cached hash", self._hashes[i], ", expected", self._h.fullHash(key)
+                j = self._h.slot(self._hashes[i])
+                while j != i:
+                    if self._keys[j] is _EMPTY:
+                        print "Rep Invariant Error, key =", key, "at slot", i, "unreachable from its hash", self._hashes[i]
+                        break
+                    j = (j + 1) % self._m
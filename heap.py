@@ -1,3 +1,5 @@
+from array import array
+
 
 class Heap(object):
     """ Heap data structure, implemented as an array.
@@ -6,39 +8,56 @@ class Heap(object):
     Heap invariant: MinHeap: key at an index is less than or equal to keys of its children
                     MaxHeap: key at an index is greater than or equal to keys of its children
     Keys should not be manipulated directly, but rather by calling createHeap, insert, and extract.
+    With a key function, the heap holds items ordered by key(item). Each key is computed once when its item is inserted and stored in
+    _keys, parallel to the items in _items, so sifts compare the raw keys directly. Methods then take and return items rather than keys.
 
     Attributes:
         _min_heap = True if the heap is a MinHeap, False if it is a MaxHeap
         _keys = list of keys in the heap
+        _key = key function used to order the items, or None if the heap holds plain keys
+        _items = list of items, parallel to _keys, or None if there is no key function
 
     """
     
-    def __init__(self, min_heap):
-        """ Initializes a heap. Use min_heap = True for a MinHeap / Priority Queue, and min_heap = False for a MaxHeap. """
+    def __init__(self, min_heap, key = None):
+        """ Initializes a heap. Use min_heap = True for a MinHeap / Priority Queue, and min_heap = False for a MaxHeap. key is an optional key function. """
         self._min_heap = min_heap
         self._keys = []
+        self._key = key
+        if key is None:
+            self._items = None
+        else:
+            self._items = []
 
     def createHeap(self, keys):
-        """ Creates a heap from the given list of keys. Overwrites any existing keys in the heap. """
-        self._keys = list(keys)
-        for i in range(len(self._keys)//2-1,-1,-1):
+        """ Creates a heap from the given list of keys (or items, with a key function). Overwrites any existing keys in the heap. """
+        if self._key is None:
+            self._keys = list(keys)
+        else:
+            self._items = list(keys)
+            self._keys = [self._key(item) for item in self._items]
+        for i in range(self._parent(self._last()),-1,-1):
             self._heapify(i)
         self.__checkRep()
 
     def modifyKey(self, i, key):
-        """ Decreases (for a MinHeap) or increases (for a MaxHeap) the key at a given index. """
+        """ Decreases (for a MinHeap) or increases (for a MaxHeap) the key at a given index. With a key function, key is the new item for that index. """
         if i >= self.size():
             return
-        elif self.isMinHeap() and key > self._keys[i]:
+
+        item = key
+        if self._key is not None:
+            key = self._key(item)
+
+        if self.isMinHeap() and key > self._keys[i]:
             return
         elif self.isMaxHeap() and key < self._keys[i]:
             return
         
         self._keys[i] = key
-        p = self._parent(i)
-        while i > 0 and self._compareKeys(self._keys[i],self._keys[self._parent(i)]):
-            self._keys[i], self._keys[self._parent(i)] = self._keys[self._parent(i)], self._keys[i]
-            i = self._parent(i)
+        if self._key is not None:
+            self._items[i] = item
+        self._siftUp(i)
             
         self.__checkRep()
 
@@ -47,18 +66,18 @@ class Heap(object):
         if self.size() == 0:
             return None
         elif self.isMinHeap():
-            return self._keys[0]
+            return self._top(0)
         else:
-            return min(self._keys)
+            return self._top(self._keys.index(min(self._keys)))
 
     def maximum(self):
         """ Returns the maximum key in the heap. Takes O(1) for a MaxHeap and O(n) time for MinHeap. """
         if self.size() == 0:
             return None
         elif self.isMaxHeap():
-            return self._keys[0]
+            return self._top(0)
         else:
-            return max(self._keys)
+            return self._top(self._keys.index(max(self._keys)))
         
     def extract(self):
         """ Extracts the minimum (for MinHeap) or maximum (for MaxHeap) key in the heap. """
@@ -70,21 +89,95 @@ class Heap(object):
         while self.size() > 0:
             ar.append(self.extract())
         return ar
+
+    def iterExtract(self):
+        """ Generator that extracts and yields elements in order, one at a time, in O(lg n) each. Stopping early leaves the rest in the heap. """
+        while self.size() > 0:
+            yield self.extract()
+
+    def drain(self):
+        """ Same as iterExtract: yields elements in order, removing each from the heap as it is yielded. """
+        return self.iterExtract()
+
+    def iterSorted(self):
+        """ Generator that yields elements in order without modifying the heap. The first k elements take O(k lg k).
+        Walks the heap with a frontier heap of indexes: after an index is yielded, its children become candidates. The heap must not be modified during iteration.
+        """
+        if self.size() == 0: return
+
+        keys = self._keys
+        frontier = Heap(self._min_heap, key = lambda i: keys[i])
+        frontier.insert(0)
+        n = self.size()
+        while frontier.size() > 0:
+            i = frontier.extract()
+            yield self._top(i)
+            for c in range(self._left(i), min(self._right(i) + 1, n)):
+                frontier.insert(c)
         
     def insert(self, key):
-        """ Inserts a key into the heap. """
-        if self.isMinHeap():
-            default = float("inf")
+        """ Inserts a key (or item, with a key function) into the heap. """
+        if self._key is None:
+            self._keys.append(key)
         else:
-            default = -float("inf")
-            
-        self._keys.append(default)
-        self.modifyKey(self._last(),key)
+            self._items.append(key)
+            self._keys.append(self._key(key))
+        self._siftUp(self._last())
+
+        self.__checkRep()
+
+    def insertMany(self, keys):
+        """ Inserts an iterable of keys (or items, with a key function) into the heap.
+        Sifts each key up when the batch is smaller than the heap, and otherwise appends the whole batch and rebuilds bottom-up in O(n + k),
+        which bounds the cost when many keys would have to travel to the top.
+        """
+        batch = list(keys)
+        if not batch: return
+
+        rebuild = len(batch) >= self.size()
+        first = self.size()
+        if self._key is None:
+            self._keys.extend(batch)
+        else:
+            self._items.extend(batch)
+            self._keys.extend([self._key(item) for item in batch])
+
+        if rebuild:
+            for i in range(self._parent(self._last()),-1,-1):
+                self._heapify(i)
+        else:
+            for i in range(first, self.size()):
+                self._siftUp(i)
+
+        self.__checkRep()
         
+    def pushPop(self, key):
+        """ Inserts a key and then extracts the top of the heap, with a single sift-down. Returns key itself if it would come out first. """
+        item = key
+        if self._key is not None:
+            key = self._key(item)
+
+        if self.size() == 0 or not self._compareKeys(self._keys[0], key):
+            return item
+        return self._replaceTop(item, key)
+
+    def replace(self, key):
+        """ Extracts the top of the heap and then inserts a key, with a single sift-down. Returns the extracted key, or None if the heap was empty. """
+        if self.size() == 0:
+            self.insert(key)
+            return None
+
+        item = key
+        if self._key is not None:
+            key = self._key(item)
+        return self._replaceTop(item, key)
+
     def delete(self, key):
-        """ Deletes the first instance of a key from the heap. Does nothing if the key does not exist. """
-        for i in range(len(self._keys)):
-            if self._keys[i] == key:
+        """ Deletes the first instance of a key (or item, with a key function) from the heap. Does nothing if the key does not exist. """
+        if self._items is None: entries = self._keys
+        else: entries = self._items
+        for i in range(len(entries)):
+            if entries[i] == key:
                 self._extractIndex(i)
                 break
     
@@ -110,7 +203,7 @@ class Heap(object):
         if r < self.size() and self._compareKeys(self._keys[r],self._keys[current]):
             current = r
         if current != i:
-            self._keys[i], self._keys[current] = self._keys[current], self._keys[i]
+            self._swap(i, current)
             self._heapify(current)
 
     def _compareKeys(self, k1, k2):
@@ -124,21 +217,46 @@ class Heap(object):
         """ Removes and returns the key at a given index. """
         if i >= self.size(): return None
         else:
-            self._keys[i], self._keys[self._last()] = self._keys[self._last()], self._keys[i]
+            self._swap(i, self._last())
             result = self._keys.pop()
+            if self._items is not None:
+                result = self._items.pop()
 
-            p = self._parent(i)
-            l = self._left(i)
-            r = self._right(i)
-            
-            if i == 0 or (l < self.size() and self._compareKeys(self._keys[l],self._keys[i])) or (r < self.size() and self._compareKeys(self._keys[r],self._keys[i])):
+            # the key moved into index i may belong either further down or further up
+            if i < self.size():
                 self._heapify(i)
-            elif i < self.size():
-                self.modifyKey(i,self._keys[i])
+                self._siftUp(i)
             
             self.__checkRep()
             return result
         
+    def _replaceTop(self, item, key):
+        """ Overwrites the top of a non-empty heap with an item whose key is already computed, and sifts it down. Returns the old top. """
+        result = self._top(0)
+        self._keys[0] = key
+        if self._items is not None:
+            self._items[0] = item
+        self._heapify(0)
+        self.__checkRep()
+        return result
+
+    def _siftUp(self, i):
+        """ Moves the key at a given index up the heap until its parent no longer compares ahead of it. """
+        while i > 0 and self._compareKeys(self._keys[i],self._keys[self._parent(i)]):
+            self._swap(i, self._parent(i))
+            i = self._parent(i)
+
+    def _swap(self, i, j):
+        """ Swaps the keys (and items, with a key function) at two indexes. """
+        self._keys[i], self._keys[j] = self._keys[j], self._keys[i]
+        if self._items is not None:
+            self._items[i], self._items[j] = self._items[j], self._items[i]
+
+    def _top(self, i):
+        """ Returns what the heap reports for index i: the item with a key function, and the key otherwise. """
+        if self._items is None: return self._keys[i]
+        else: return self._items[i]
+
     def _parent(self, i):
         """ Returns the index of the parent of a given index. """
         return (i + 1) // 2 - 1
@@ -169,13 +287,725 @@ class Heap(object):
     def __checkRep(self):
         """ Checks the rep invariant for the structure. Prints a message if the invariant is not met. For debugging. """
         if False: # set to True for debugging
-            for i in range(self.size()):
-                l = self._left(i)
-                r = self._right(i)
-                if l < self.size() and self._compareKeys(self._keys[l], self._keys[i]):
-                    print "Rep Invariant Error, index =", i, ", len =", self.size(), ", key =", self._keys[i], ", left =", self._keys[l]
-                if r < self.size() and self._compareKeys(self._keys[r], self._keys[i]):
-                    print "Rep Invariant Error, index =", i, ", len =", self.size(), ", key =", self._keys[i], ", right =", self._keys[r]
+            for i in range(1, self.size()):
+                p = self._parent(i)
+                if self._compareKeys(self._keys[i], self._keys[p]):
+                    print "Rep Invariant Error, index =", p, ", len =", self.size(), ", key =", self._keys[p], ", child =", self._keys[i]
+
+class DaryHeap(Heap):
+    """ Heap where every node has d children instead of 2. Inherits from Heap, with the same API (createHeap, insert, extract, extractAll, modifyKey).
+
+    The tree is only log_d(n) levels tall, so insert and modifyKey make fewer sift-up swaps, while extract compares up to d children per level.
+    Uses an iterative sift-down. d = 2 behaves like Heap.
+
+    Attributes:
+        _d = number of children of each node
+    """
+
+    def __init__(self, d, min_heap, key = None):
+        """ Initializes a d-ary heap. Use min_heap = True for a MinHeap / Priority Queue, and min_heap = False for a MaxHeap. key is an optional key function.
+        Raises ValueError if d is less than 2.
+        """
+        if d < 2:
+            raise ValueError("DaryHeap needs d >= 2 children per node, got " + str(d))
+        super(DaryHeap, self).__init__(min_heap, key)
+        self._d = d
+
+    def arity(self):
+        """ Returns the number of children of each node. """
+        return self._d
+
+    def _heapify(self, i):
+        """ Fixes the heap invariant at a given index, moving its key down the tree iteratively. """
+        keys = self._keys
+        n = len(keys)
+        d = self._d
+        while True:
+            first = d * i + 1
+            if first >= n: return
+
+            best = i
+            for c in range(first, min(first + d, n)):
+                if self._compareKeys(keys[c], keys[best]):
+                    best = c
+            if best == i: return
+
+            self._swap(i, best)
+            i = best
+
+    def _parent(self, i):
+        """ Returns the index of the parent of a given index. """
+        return (i - 1) // self._d
+
+    def _left(self, i):
+        """ Returns the index of the first child of a given index. """
+        return self._d * i + 1
+
+    def _right(self, i):
+        """ Returns the index of the last child of a given index. """
+        return self._d * i + self._d
+
+    def __str__(self):
+        """ Returns a string representation of the heap. """
+        return str(self._d) + "-ary " + super(DaryHeap, self).__str__()
+
+class PayloadHeap(object):
+    """ Heap of (priority, payload) entries stored in two parallel arrays, implemented as an array.
+
+    Priorities are kept in a flat array (a typed array.array when a typecode is given, e.g. 'd' or 'l', and a list otherwise)
+    and payloads in a parallel list, moved in lockstep. Sifts compare the raw priorities only and never touch the payloads,
+    so there is no per-entry wrapper object (like a KeyValuePair) and no Python-level comparison method.
+    Sifts move entries into a hole instead of swapping pairs, writing each slot once.
+    Payloads are never compared, so entries with equal priorities come out in an unspecified order.
+
+    Attributes:
+        _min_heap = True if the smallest priority comes out first, False for the largest
+        _priorities = array.array (or list) of priorities
+        _payloads = list of payloads, parallel to _priorities
+    """
+
+    def __init__(self, min_heap = True, typecode = None):
+        """ Initializes an empty heap. typecode is an optional array.array typecode for the priorities, such as 'd' for floats or 'l' for ints. """
+        self._min_heap = min_heap
+        if typecode is None:
+            self._priorities = []
+        else:
+            self._priorities = array(typecode)
+        self._payloads = []
+
+    def push(self, priority, payload = None):
+        """ Adds a payload with a given priority, in O(lg n). """
+        self._priorities.append(priority)
+        self._payloads.append(payload)
+        self._siftUp(len(self._payloads) - 1, priority, payload)
+        self.__checkRep()
+
+    def pop(self):
+        """ Removes and returns the first (priority, payload) pair, in O(lg n). Returns None if the heap is empty. """
+        n = len(self._payloads)
+        if n == 0: return None
+
+        priorities, payloads = self._priorities, self._payloads
+        result = (priorities[0], payloads[0])
+        priority, payload = priorities.pop(), payloads.pop()
+        if n > 1:
+            self._siftDown(0, priority, payload)
+        self.__checkRep()
+        return result
+
+    def peek(self):
+        """ Returns the first (priority, payload) pair without removing it, or None if the heap is empty. """
+        if len(self._payloads) == 0: return None
+        else: return (self._priorities[0], self._payloads[0])
+
+    def size(self):
+        """ Returns the size / length of the heap. """
+        return len(self._payloads)
+
+    def _siftUp(self, i, priority, payload):
+        """ Moves the hole at index i up past parents that should come after the given entry, then fills it with the entry. """
+        priorities, payloads = self._priorities, self._payloads
+        min_heap = self._min_heap
+        while i > 0:
+            p = (i - 1) >> 1
+            if (min_heap and priority < priorities[p]) or (not min_heap and priority > priorities[p]):
+                priorities[i] = priorities[p]
+                payloads[i] = payloads[p]
+                i = p
+            else:
+                break
+        priorities[i] = priority
+        payloads[i] = payload
+
+    def _siftDown(self, i, priority, payload):
+        """ Moves the hole at index i down past children that should come before the given entry, then fills it with the entry. """
+        priorities, payloads = self._priorities, self._payloads
+        min_heap = self._min_heap
+        n = len(payloads)
+        while True:
+            c = 2 * i + 1
+            if c >= n: break
+            if c + 1 < n and ((min_heap and priorities[c + 1] < priorities[c]) or (not min_heap and priorities[c + 1] > priorities[c])):
+                c += 1
+            if (min_heap and priorities[c] < priority) or (not min_heap and priorities[c] > priority):
+                priorities[i] = priorities[c]
+                payloads[i] = payloads[c]
+                i = c
+            else:
+                break
+        priorities[i] = priority
+        payloads[i] = payload
+
+    def __len__(self):
+        """ Returns the length / size of the heap. """
+        return len(self._payloads)
+
+    def __str__(self):
+        """ Returns a string representation of the heap. """
+        return "PayloadHeap, priorities = " + str(list(self._priorities))
+
+    def __checkRep(self):
+        """ Checks the rep invariant for the structure. Prints a message if the invariant is not met. For debugging. """
+        if False: # set to True for debugging
+            if len(self._priorities) != len(self._payloads):
+                print "Rep Invariant Error, priorities and payloads have different lengths"
+            for i in range(1, len(self._priorities)):
+                p = (i - 1) // 2
+                if (self._min_heap and self._priorities[i] < self._priorities[p]) or (not self._min_heap and self._priorities[i] > self._priorities[p]):
+                    print "Rep Invariant Error, index =", p, ", priority =", self._priorities[p], ", child =", self._priorities[i]
+
+class TopK(object):
+    """ Streaming accumulator for the k largest (or smallest) items seen so far, in O(k) memory.
+
+    Keeps a heap of at most k items whose top is the worst item kept. Once the heap is full, each new item costs one comparison
+    with the top, plus a single sift-down (Heap.replace) if it displaces the top.
+
+    Attributes:
+        _k = number of items to keep
+        _largest = True to keep the largest items, False to keep the smallest
+        _key = key function used to compare items, or None to compare the items themselves
+        _heap = MinHeap (for the largest items) or MaxHeap (for the smallest items) of the items kept
+    """
+
+    def __init__(self, k, largest = True, key = None):
+        """ Initializes an empty accumulator for the k largest items (largest = True) or k smallest items (largest = False). """
+        self._k = k
+        self._largest = largest
+        self._key = key
+        self._heap = Heap(largest, key)
+
+    def push(self, item):
+        """ Offers an item to the accumulator. O(1) if it is not among the best k so far, and O(lg k) otherwise. """
+        heap = self._heap
+        if len(heap) < self._k:
+            heap.insert(item)
+            return
+
+        if self._k <= 0: return
+        key = item
+        if self._key is not None:
+            key = self._key(item)
+        if heap._compareKeys(heap._keys[0], key):
+            heap._replaceTop(item, key)
+
+    def pushMany(self, items):
+        """ Offers every item of an iterable to the accumulator. """
+        for item in items:
+            self.push(item)
+
+    def result(self):
+        """ Returns the items kept, best first (largest first if largest = True). Does not modify the accumulator. """
+        if self._heap._items is None: items = self._heap._keys
+        else: items = self._heap._items
+        return sorted(items, key = self._key, reverse = self._largest)
+
+    def __len__(self):
+        """ Returns the number of items kept, at most k. """
+        return len(self._heap)
+
+def topK(iterable, k, largest = True, key = None):
+    """
+    Returns the k largest (or smallest, with largest = False) items of an iterable, best first, in O(k) memory and O(n lg k) time.
+    type iterable: any iterable of items comparable to each other (or with comparable keys)
+    type k: int
+    rtype: List[]
+    """
+    acc = TopK(k, largest, key)
+    acc.pushMany(iterable)
+    return acc.result()
+
+def merge(*iterables, **kwargs):
+    """
+    Lazily merges sorted iterables into one sorted stream, like heapq.merge. Keeps only the current head of each input in a heap,
+    so memory is O(k) for k inputs, the first value is ready after O(k), and each further value costs O(lg k).
+    Takes optional keyword arguments key (key function, computed once per value) and reverse (True if the inputs are sorted largest first).
+    Equal values come out in the order of the inputs they came from. Raises TypeError, when called, for any other keyword argument.
+    type iterables: iterables, each sorted by key (in reverse if reverse = True)
+    rtype: generator
+    """
+    unexpected = set(kwargs) - set(["key", "reverse"])
+    if unexpected:
+        raise TypeError("merge() got unexpected keyword arguments: " + ", ".join(sorted(unexpected)))
+    return _merge(iterables, kwargs.get("key"), kwargs.get("reverse", False))
+
+def _merge(iterables, key, reverse):
+    """ Generator behind merge(), for validated arguments. """
+    # heap entries are (key, tiebreak, value, iterator); the tiebreak is unique, so values and iterators are never compared
+    heap = Heap(not reverse)
+    entries = []
+    for i, iterable in enumerate(iterables):
+        it = iter(iterable)
+        for value in it:
+            if key is None: k = value
+            else: k = key(value)
+            if reverse: entries.append((k, -i, value, it))
+            else: entries.append((k, i, value, it))
+            break
+    heap.createHeap(entries)
+
+    while len(heap) > 1:
+        if reverse: k, tiebreak, value, it = heap.maximum()
+        else: k, tiebreak, value, it = heap.minimum()
+        yield value
+
+        for value in it:
+            if key is None: k = value
+            else: k = key(value)
+            heap.replace((k, tiebreak, value, it))
+            break
+        else:
+            heap.extract()
+
+    if len(heap) == 1:
+        k, tiebreak, value, it = heap.extract()
+        yield value
+        for value in it:
+            yield value
+
+class MinMaxHeap(object):
+    """ Min-max heap: a double-ended priority queue with O(1) access to both the minimum and the maximum, implemented as an array.
+
+    Levels alternate between min levels (the root's level) and max levels. Heap invariant: a key on a min level is less than or equal to
+    every key below it, and a key on a max level is greater than or equal to every key below it. So the minimum is the root, and the
+    maximum is one of the root's children. insert, extractMin and extractMax take O(lg n).
+    With a capacity, the heap keeps at most that many keys: inserting into a full heap evicts the maximum (or, with evict_max = False,
+    the minimum) if the new key is better, and otherwise rejects the new key.
+
+    Attributes:
+        _keys = list of keys in the heap
+        _capacity = maximum number of keys, or None for unbounded
+        _evict_max = True to evict the maximum when full (keeping the smallest keys), False to evict the minimum
+    """
+
+    def __init__(self, capacity = None, evict_max = True):
+        """ Initializes an empty min-max heap, with optional capacity. """
+        self._keys = []
+        self._capacity = capacity
+        self._evict_max = evict_max
+
+    def createHeap(self, keys):
+        """ Creates a heap from the given list of keys, in O(n). Overwrites any existing keys. With a capacity, only the best keys are kept. """
+        self._keys = list(keys)
+        if self._capacity is not None and len(self._keys) > self._capacity:
+            self._keys.sort(reverse = not self._evict_max)
+            del self._keys[self._capacity:]
+        for i in range(len(self._keys)//2-1,-1,-1):
+            self._trickleDown(i)
+        self.__checkRep()
+
+    def insert(self, key):
+        """ Inserts a key in O(lg n). If the heap is full, returns the key that was evicted or rejected; otherwise returns None. """
+        if self._capacity is not None and len(self._keys) >= self._capacity:
+            if self._capacity <= 0: return key
+            if self._evict_max:
+                if not key < self.maximum(): return key
+                evicted = self.extractMax()
+            else:
+                if not key > self.minimum(): return key
+                evicted = self.extractMin()
+            self._insert(key)
+            return evicted
+
+        self._insert(key)
+        return None
+
+    def minimum(self):
+        """ Returns the minimum key in O(1), or None if the heap is empty. """
+        if len(self._keys) == 0: return None
+        else: return self._keys[0]
+
+    def maximum(self):
+        """ Returns the maximum key in O(1), or None if the heap is empty. """
+        if len(self._keys) == 0: return None
+        else: return self._keys[self._maxIndex()]
+
+    def extractMin(self):
+        """ Extracts the minimum key in O(lg n). Returns None if the heap is empty. """
+        if len(self._keys) == 0: return None
+        return self._extractIndex(0)
+
+    def extractMax(self):
+        """ Extracts the maximum key in O(lg n). Returns None if the heap is empty. """
+        if len(self._keys) == 0: return None
+        return self._extractIndex(self._maxIndex())
+
+    def capacity(self):
+        """ Returns the maximum number of keys, or None if the heap is unbounded. """
+        return self._capacity
+
+    def size(self):
+        """ Returns the size / length of the heap. """
+        return len(self._keys)
+
+    def _insert(self, key):
+        """ Appends a key and bubbles it up to its place. """
+        self._keys.append(key)
+        self._bubbleUp(len(self._keys) - 1)
+        self.__checkRep()
+
+    def _extractIndex(self, i):
+        """ Removes and returns the key at a given index, replacing it with the last key and trickling that down. """
+        keys = self._keys
+        keys[i], keys[-1] = keys[-1], keys[i]
+        result = keys.pop()
+        if i < len(keys):
+            self._trickleDown(i)
+        self.__checkRep()
+        return result
+
+    def _maxIndex(self):
+        """ Returns the index of the maximum key: the root if it is alone, and otherwise the larger of its children. Heap must be non-empty. """
+        keys = self._keys
+        if len(keys) == 1: return 0
+        elif len(keys) == 2 or keys[1] >= keys[2]: return 1
+        else: return 2
+
+    def _isMinLevel(self, i):
+        """ Returns True if index i is on a min level (even depth), and False if it is on a max level. """
+        return (i + 1).bit_length() % 2 == 1
+
+    def _bubbleUp(self, i):
+        """ Moves the key at index i up to its place, through the min levels or the max levels as appropriate. """
+        if i == 0: return
+        keys = self._keys
+        p = (i - 1) // 2
+        if self._isMinLevel(i):
+            if keys[i] > keys[p]:
+                keys[i], keys[p] = keys[p], keys[i]
+                self._bubbleUpLevels(p, False)
+            else:
+                self._bubbleUpLevels(i, True)
+        else:
+            if keys[i] < keys[p]:
+                keys[i], keys[p] = keys[p], keys[i]
+                self._bubbleUpLevels(p, True)
+            else:
+                self._bubbleUpLevels(i, False)
+
+    def _bubbleUpLevels(self, i, min_level):
+        """ Moves the key at index i up through its grandparents while it belongs above them (smaller on min levels, larger on max levels). """
+        keys = self._keys
+        while i > 2:
+            g = ((i - 1) // 2 - 1) // 2
+            if (min_level and keys[i] < keys[g]) or (not min_level and keys[i] > keys[g]):
+                keys[i], keys[g] = keys[g], keys[i]
+                i = g
+            else:
+                break
+
+    def _trickleDown(self, i):
+        """ Moves the key at index i down to its place among its children and grandchildren. """
+        keys = self._keys
+        n = len(keys)
+        min_level = self._isMinLevel(i)
+        while True:
+            # find the best (smallest on min levels, largest on max levels) of the children and grandchildren
+            m = None
+            for c in (2*i + 1, 2*i + 2, 4*i + 3, 4*i + 4, 4*i + 5, 4*i + 6):
+                if c >= n: continue
+                if m is None or (min_level and keys[c] < keys[m]) or (not min_level and keys[c] > keys[m]):
+                    m = c
+            if m is None: return
+
+            if (min_level and not keys[m] < keys[i]) or (not min_level and not keys[m] > keys[i]):
+                return
+            keys[i], keys[m] = keys[m], keys[i]
+            if m <= 2*i + 2:
+                return
+
+            # m is a grandchild: the key moved there may now be on the wrong side of its parent
+            p = (m - 1) // 2
+            if (min_level and keys[m] > keys[p]) or (not min_level and keys[m] < keys[p]):
+                keys[m], keys[p] = keys[p], keys[m]
+            i = m
+
+    def __len__(self):
+        """ Returns the length / size of the heap. """
+        return len(self._keys)
+
+    def __str__(self):
+        """ Returns a string representation of the heap. """
+        return "MinMaxHeap, keys = " + str(self._keys)
+
+    def __checkRep(self):
+        """ Checks the rep invariant: every key is within the bounds set by its ancestors on min and max levels. For debugging. """
+        if False: # set to True for debugging
+            for i in range(1, len(self._keys)):
+                j = (i - 1) // 2
+                while j >= 0:
+                    if self._isMinLevel(j) and self._keys[i] < self._keys[j]:
+                        print "Rep Invariant Error, index =", i, ", key =", self._keys[i], "below min-level ancestor", self._keys[j]
+                    if not self._isMinLevel(j) and self._keys[i] > self._keys[j]:
+                        print "Rep Invariant Error, index =", i, ", key =", self._keys[i], "above max-level ancestor", self._keys[j]
+                    if j == 0: break
+                    j = (j - 1) // 2
+
+class RadixHeap(object):
+    """ Radix heap: a MinHeap for non-negative integer keys, where extracted keys never decrease (e.g. event timestamps).
+
+    Keys are kept in buckets by the highest bit in which they differ from the last extracted key: bucket 0 holds keys equal to it,
+    and bucket b holds keys whose highest differing bit is b-1. extractMin empties the lowest non-empty bucket by finding its minimum and
+    redistributing its keys into lower buckets, so each key moves at most O(lg C) times for keys up to C, with almost no comparisons.
+    Inserting a key smaller than the last extracted minimum raises ValueError. minimum() does not redistribute any bucket,
+    so peeking never changes which keys can be inserted.
+
+    Attributes:
+        _buckets = list of buckets, each a list of (key, value) pairs
+        _last = last extracted minimum key; all keys in the heap are >= _last
+        _peek = minimum key of the buckets above bucket 0, found by minimum() and reused by the next refill, or None
+        _n = number of keys in the heap
+    """
+
+    def __init__(self):
+        """ Initializes an empty radix heap. """
+        self._buckets = [[]]
+        self._last = 0
+        self._peek = None
+        self._n = 0
+
+    def insert(self, key, value = None):
+        """ Inserts an integer key, with an optional value, in O(1). Raises ValueError if key is smaller than the last extracted minimum. """
+        if key < self._last:
+            raise ValueError("RadixHeap key " + str(key) + " is smaller than the last extracted minimum " + str(self._last))
+
+        b = (key ^ self._last).bit_length()
+        while len(self._buckets) <= b:
+            self._buckets.append([])
+        self._buckets[b].append((key, value))
+        self._n += 1
+        if b > 0 and self._peek is not None and key < self._peek:
+            self._peek = key
+
+    def minimum(self):
+        """ Returns the minimum key in the heap, or None if the heap is empty. Does not move any keys. """
+        if self._n == 0: return None
+        buckets = self._buckets
+        if buckets[0]: return self._last
+
+        # keys in lower buckets are smaller than keys in higher ones, so the minimum is in the lowest non-empty bucket
+        if self._peek is None:
+            b = 1
+            while not buckets[b]:
+                b += 1
+            self._peek = min(item[0] for item in buckets[b])
+        return self._peek
+
+    def extractMin(self):
+        """ Extracts the minimum key in the heap, in O(lg C) amortized. Returns None if the heap is empty. """
+        item = self.extractMinItem()
+        if item is None: return None
+        else: return item[0]
+
+    def extractMinItem(self):
+        """ Extracts the minimum key in the heap with its value, as a (key, value) pair. Returns None if the heap is empty. """
+        if self._n == 0: return None
+        self._refill()
+        self._n -= 1
+        return self._buckets[0].pop()
+
+    def extractAll(self):
+        """ Extracts all keys in order. Heap becomes empty. """
+        ar = []
+        while self._n > 0:
+            ar.append(self.extractMin())
+        return ar
+
+    def size(self):
+        """ Returns the size / length of the heap. """
+        return self._n
+
+    def _refill(self):
+        """ If bucket 0 is empty, moves the minimum of the lowest non-empty bucket into _last and redistributes that bucket. Heap must be non-empty. """
+        buckets = self._buckets
+        if buckets[0]: return
+
+        b = 1
+        while not buckets[b]:
+            b += 1
+
+        items = buckets[b]
+        buckets[b] = []
+        if self._peek is None:
+            last = min(item[0] for item in items)
+        else:
+            last = self._peek
+        self._last = last
+        self._peek = None
+        for item in items:
+            buckets[(item[0] ^ last).bit_length()].append(item)
+
+    def __len__(self):
+        """ Returns the length / size of the heap. """
+        return self._n
+
+    def __str__(self):
+        """ Returns a string representation of the heap. """
+        return "RadixHeap, size = " + str(self._n) + ", last minimum = " + str(self._last)
+
+class PairingNode(object):
+    """ Node of a PairingHeap, returned by insert() as a handle for decreaseKey() and delete().
+
+    All Node pointers must be maintained by the heap itself.
+
+    Attributes:
+        key = the key of this node
+        value = optional payload stored with the key
+        child = leftmost child of this node
+        sibling = next sibling to the right
+        prev = parent if this node is a leftmost child, otherwise the previous sibling; None for the root
+    """
+
+    def __init__(self, key, value = None):
+        """ Initializes a new node with given key and optional value. """
+        self.key = key
+        self.value = value
+        self.child = None
+        self.sibling = None
+        self.prev = None
+
+    def __str__(self):
+        """ Returns a string representation of this node. """
+        return "node: key = " + str(self.key) + ", value = " + str(self.value)
+
+class PairingHeap(object):
+    """ Pairing heap: a node-based MinHeap with O(1) insert, meld and amortized decrease-key.
+
+    insert returns a node handle that stays valid until the node is extracted, so keys can be decreased without knowing any index.
+    extractMin runs in O(lg n) amortized, using the standard two-pass pairing of the root's children.
+    Keys should not be manipulated directly, but rather by calling insert, decreaseKey, delete, and extractMin.
+
+    Attributes:
+        _r = root node, holding the minimum key
+        _n = number of nodes in the heap
+    """
+
+    def __init__(self):
+        """ Initializes an empty pairing heap. """
+        self._r = None
+        self._n = 0
+
+    def insert(self, key, value = None):
+        """ Inserts a key, with an optional value, in O(1). Returns the node handle. """
+        node = PairingNode(key, value)
+        self._r = self._link(self._r, node)
+        self._n += 1
+        return node
+
+    def minimum(self):
+        """ Returns the minimum key in the heap, or None if the heap is empty. O(1). """
+        if self._r is None: return None
+        else: return self._r.key
+
+    def minimumNode(self):
+        """ Returns the node handle with the minimum key, or None if the heap is empty. O(1). """
+        return self._r
+
+    def extractMin(self):
+        """ Removes and returns the node handle with the minimum key, or None if the heap is empty. O(lg n) amortized. """
+        root = self._r
+        if root is None: return None
+
+        self._r = self._mergePairs(root.child)
+        if self._r is not None:
+            self._r.prev = None
+        self._n -= 1
+
+        root.child = None
+        return root
+
+    def decreaseKey(self, node, key):
+        """ Decreases the key of a node in O(1) amortized. Does nothing if the new key is larger than existing. """
+        if key > node.key:
+            return
+
+        node.key = key
+        if node is not self._r:
+            self._cut(node)
+            self._r = self._link(self._r, node)
+
+    def delete(self, node):
+        """ Removes a node from the heap in O(lg n) amortized. """
+        if node is self._r:
+            self.extractMin()
+            return
+
+        self._cut(node)
+        subtree = self._mergePairs(node.child)
+        node.child = None
+        self._r = self._link(self._r, subtree)
+        self._n -= 1
+
+    def meld(self, other):
+        """ Moves all nodes of another PairingHeap into this one in O(1). The other heap becomes empty; its node handles stay valid here. """
+        self._r = self._link(self._r, other._r)
+        self._n += other._n
+        other._r = None
+        other._n = 0
+
+    def extractAll(self):
+        """ Extracts all keys in order. Heap becomes empty. """
+        ar = []
+        while self._r is not None:
+            ar.append(self.extractMin().key)
+        return ar
+
+    def size(self):
+        """ Returns the size / length of the heap. """
+        return self._n
+
+    def _link(self, a, b):
+        """ Links two heap-ordered trees, making the root with the larger key the leftmost child of the other. Returns the new root. """
+        if a is None: return b
+        if b is None: return a
+
+        if b.key < a.key:
+            a, b = b, a
+        b.prev = a
+        b.sibling = a.child
+        if a.child is not None:
+            a.child.prev = b
+        a.child = b
+        a.sibling = None
+        a.prev = None
+        return a
+
+    def _cut(self, node):
+        """ Detaches the subtree rooted at a non-root node from its parent and siblings. """
+        if node.prev.child is node:
+            node.prev.child = node.sibling
+        else:
+            node.prev.sibling = node.sibling
+        if node.sibling is not None:
+            node.sibling.prev = node.prev
+        node.prev = None
+        node.sibling = None
+
+    def _mergePairs(self, first):
+        """ Merges a list of sibling trees into one with the two-pass pairing: link pairs left to right, then fold right to left. Returns the root. """
+        pairs = []
+        while first is not None:
+            a = first
+            b = a.sibling
+            if b is None:
+                first = None
+            else:
+                first = b.sibling
+                b.sibling = None
+            a.sibling = None
+            pairs.append(self._link(a, b))
+
+        root = None
+        for tree in reversed(pairs):
+            root = self._link(tree, root)
+        return root
+
+    def __len__(self):
+        """ Returns the length / size of the heap. """
+        return self._n
+
+    def __str__(self):
+        """ Returns a string representation of the heap. """
+        return "PairingHeap, size = " + str(self._n) + ", minimum = " + str(self.minimum())
 
 class MinHeap(Heap):
     """ MinHeap, with all functionality derived from Heap class.
@@ -187,9 +1017,9 @@ class MinHeap(Heap):
         none, apart from parent class
     """
     
-    def __init__(self):
-        """ Initializes a new MinHeap. """
-        super(MinHeap, self).__init__(True)
+    def __init__(self, key = None):
+        """ Initializes a new MinHeap, with optional key function. """
+        super(MinHeap, self).__init__(True, key)
         
     def createMinHeap(self, keys):
         """ Creates a MinHeap from an array of keys. Erases any existing keys. """
@@ -213,9 +1043,9 @@ class MaxHeap(Heap):
         none, apart from parent class
     """
     
-    def __init__(self):
-        """ Initializes a new MaxHeap. """
-        super(MaxHeap, self).__init__(False)
+    def __init__(self, key = None):
+        """ Initializes a new MaxHeap, with optional key function. """
+        super(MaxHeap, self).__init__(False, key)
         
     def createMaxHeap(self, keys):
         """ Creates a MaxHeap from an array of keys. Erases any existing keys. """
@@ -228,3 +1058,106 @@ class MaxHeap(Heap):
     def extractMax(self):
         """ Extracts the maximum key in the heap. Returns None if the heap is empty. """
         return super(MaxHeap, self).extract()
+
+
+class IndexedHeap(Heap):
+    """ Heap of distinct items with separate priorities, which tracks the position of every item. Inherits from Heap.
+
+    A position map from item to index is updated on every swap, so items can be found in O(1), and deleted or given a new
+    priority (up or down) in O(lg n) without knowing their index. Items must be hashable and distinct.
+    extract, minimum and maximum return items; use priority() to get an item's priority.
+
+    Attributes:
+        _keys = list of priorities in the heap
+        _items = list of items, parallel to _keys
+        _pos = dict of item -> index of the item in _keys and _items
+    """
+
+    def __init__(self, min_heap):
+        """ Initializes an empty indexed heap. Use min_heap = True for a MinHeap / Priority Queue, and min_heap = False for a MaxHeap. """
+        super(IndexedHeap, self).__init__(min_heap)
+        self._items = []
+        self._pos = {}
+
+    def createHeap(self, pairs):
+        """ Creates a heap from the given (item, priority) pairs. Overwrites any existing items. If an item is repeated, the last priority is kept. """
+        priorities = {}
+        for item, priority in pairs:
+            priorities[item] = priority
+
+        self._items = list(priorities)
+        self._keys = [priorities[item] for item in self._items]
+        self._pos = dict((item, i) for i, item in enumerate(self._items))
+        for i in range(len(self._keys)//2-1,-1,-1):
+            self._heapify(i)
+
+    def insert(self, item, priority):
+        """ Inserts an item with a given priority. If the item is already in the heap, its priority is updated instead. O(lg n). """
+        if item in self._pos:
+            self.update(item, priority)
+            return
+
+        self._keys.append(priority)
+        self._items.append(item)
+        self._pos[item] = self._last()
+        self._siftUp(self._last())
+
+    def insertMany(self, pairs):
+        """ Inserts an iterable of (item, priority) pairs, updating the priority of items already in the heap. """
+        for item, priority in pairs:
+            self.insert(item, priority)
+
+    def pushPop(self, key):
+        """ Not supported; items need a priority. Use insert and extract instead. """
+        raise TypeError("IndexedHeap does not support pushPop; use insert(item, priority) and extract()")
+
+    def replace(self, key):
+        """ Not supported; items need a priority. Use extract and insert instead. """
+        raise TypeError("IndexedHeap does not support replace; use extract() and insert(item, priority)")
+
+    def update(self, item, priority):
+        """ Changes the priority of an item, in either direction, in O(lg n). Does nothing if the item is not in the heap. """
+        i = self._pos.get(item)
+        if i is None: return
+
+        old = self._keys[i]
+        self._keys[i] = priority
+        if self._compareKeys(priority, old):
+            self._siftUp(i)
+        else:
+            self._heapify(i)
+
+    def delete(self, item):
+        """ Deletes an item from the heap in O(lg n). Does nothing if the item is not in the heap. """
+        i = self._pos.get(item)
+        if i is not None:
+            self._extractIndex(i)
+
+    def contains(self, item):
+        """ Returns True if the item is in the heap, and False otherwise. O(1). """
+        return item in self._pos
+
+    def priority(self, item):
+        """ Returns the priority of an item, or None if the item is not in the heap. O(1). """
+        i = self._pos.get(item)
+        if i is None: return None
+        else: return self._keys[i]
+
+    def _extractIndex(self, i):
+        """ Removes and returns the item at a given index, dropping it from the position map. """
+        if i >= self.size(): return None
+
+        item = self._items[i]
+        super(IndexedHeap, self)._extractIndex(i)
+        del self._pos[item]
+        return item
+
+    def _swap(self, i, j):
+        """ Swaps the priorities and items at two indexes, and updates their positions. """
+        super(IndexedHeap, self)._swap(i, j)
+        self._pos[self._items[i]] = i
+        self._pos[self._items[j]] = j
+
+    def __contains__(self, item):
+        """ Allows calling item in heap to determine whether an item is in the heap. """
+        return self.contains(item)
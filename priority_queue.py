@@ -0,0 +1,265 @@
+from heap import Heap, MinHeap
+
+import collections
+import threading
+import time
+
+try:
+    from Queue import Empty
+except ImportError:
+    from queue import Empty
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+class ConcurrentPriorityQueue(object):
+    """ Thread-safe blocking priority queue, wrapping a Heap.
+
+    put and get can be called from any number of threads. get blocks until an item is available (or raises Empty once a timeout passes),
+    waking up through a condition variable rather than polling. getMany drains up to n items under a single lock acquisition,
+    so many consumers contend for the lock once per batch instead of once per item.
+
+    Attributes:
+        _heap = Heap holding the queued items
+        _not_empty = condition variable, on the queue's lock, signalled when items are added
+    """
+
+    def __init__(self, min_heap = True, key = None):
+        """ Initializes an empty queue. Use min_heap = True to get the smallest item first, and min_heap = False for the largest. key is an optional key function. """
+        self._heap = Heap(min_heap, key)
+        self._not_empty = threading.Condition(threading.Lock())
+
+    def put(self, item):
+        """ Adds an item to the queue and wakes up one waiting consumer. """
+        with self._not_empty:
+            self._heap.insert(item)
+            self._not_empty.notify()
+
+    def putMany(self, items):
+        """ Adds an iterable of items to the queue under a single lock acquisition, waking up one consumer per item. """
+        batch = list(items)
+        if not batch: return
+
+        with self._not_empty:
+            self._heap.insertMany(batch)
+            self._not_empty.notify(len(batch))
+
+    def get(self, timeout = None):
+        """ Removes and returns the first item, blocking until one is available. Raises Empty if timeout seconds pass first. """
+        with self._not_empty:
+            if not self._waitForItem(timeout):
+                raise Empty("no item within the timeout")
+            return self._heap.extract()
+
+    def getMany(self, n, timeout = None):
+        """ Removes and returns up to n items in priority order, under a single lock acquisition.
+        Blocks until at least one item is available, and returns an empty list if timeout seconds pass first.
+        """
+        with self._not_empty:
+            if not self._waitForItem(timeout): return []
+            items = []
+            while len(items) < n and len(self._heap) > 0:
+                items.append(self._heap.extract())
+            return items
+
+    def getNowait(self):
+        """ Removes and returns the first item. Raises Empty if the queue is empty. Does not block. """
+        with self._not_empty:
+            if len(self._heap) == 0:
+                raise Empty("queue is empty")
+            return self._heap.extract()
+
+    def _waitForItem(self, timeout):
+        """ Waits on the condition, with the lock held, until the heap is non-empty. Returns False if timeout seconds pass first. """
+        if timeout is None:
+            while len(self._heap) == 0:
+                self._not_empty.wait()
+            return True
+
+        end = time.time() + timeout
+        while len(self._heap) == 0:
+            remaining = end - time.time()
+            if remaining <= 0: return False
+            self._not_empty.wait(remaining)
+        return True
+
+    def __len__(self):
+        """ Returns the number of items in the queue. """
+        with self._not_empty:
+            return len(self._heap)
+
+class AsyncPriorityQueue(object):
+    """ Priority queue for asyncio coroutines, wrapping a Heap. Requires asyncio.
+
+    get and getMany return futures, so consumers write item = await queue.get(). Waiting consumers are served in the order they
+    called get, and each put hands its item straight to the first waiter. All methods must be called from the event loop's thread.
+
+    Attributes:
+        _heap = Heap holding the queued items
+        _waiters = deque of (future, n) for consumers waiting on an empty queue; n is None for get and the batch size for getMany
+    """
+
+    def __init__(self, min_heap = True, key = None):
+        """ Initializes an empty queue. Use min_heap = True to get the smallest item first, and min_heap = False for the largest. key is an optional key function. """
+        if asyncio is None:
+            raise ImportError("AsyncPriorityQueue requires asyncio")
+        self._heap = Heap(min_heap, key)
+        self._waiters = collections.deque()
+
+    def put(self, item):
+        """ Adds an item to the queue, handing it to the first waiting consumer if there is one. """
+        self._heap.insert(item)
+        self._wakeup()
+
+    def putMany(self, items):
+        """ Adds an iterable of items to the queue, then serves as many waiting consumers as possible. """
+        self._heap.insertMany(items)
+        self._wakeup()
+
+    def get(self):
+        """ Returns a future for the first item. The item is removed from the queue as soon as the future is resolved. """
+        return self._request(None)
+
+    def getMany(self, n):
+        """ Returns a future for a list of up to n items in priority order, resolved as soon as at least one item is available. """
+        return self._request(n)
+
+    def getNowait(self):
+        """ Removes and returns the first item. Raises Empty if the queue is empty. """
+        if len(self._heap) == 0:
+            raise Empty("queue is empty")
+        return self._heap.extract()
+
+    def _request(self, n):
+        """ Creates the future for get (n = None) or getMany (n items), resolving it immediately if items are waiting. """
+        future = asyncio.get_event_loop().create_future()
+        self._waiters.append((future, n))
+        self._wakeup()
+        return future
+
+    def _wakeup(self):
+        """ Resolves waiting futures, oldest first, while there are items. Futures cancelled by their consumer are skipped. """
+        while self._waiters and len(self._heap) > 0:
+            future, n = self._waiters.popleft()
+            if future.done(): continue
+
+            if n is None:
+                future.set_result(self._heap.extract())
+            else:
+                items = []
+                while len(items) < n and len(self._heap) > 0:
+                    items.append(self._heap.extract())
+                future.set_result(items)
+
+    def __len__(self):
+        """ Returns the number of items in the queue. """
+        return len(self._heap)
+
+class Timer(object):
+    """ Handle for a deadline scheduled on a DeadlineScheduler, returned by schedule() and passed to cancel().
+
+    All attributes must be maintained by the scheduler itself.
+
+    Attributes:
+        deadline = time at which the timer is due
+        payload = object returned by popDue once the timer is due
+        cancelled = True once the timer has been cancelled
+        fired = True once the timer has been returned by popDue
+        _seq = scheduling order, so timers with equal deadlines fire in the order they were scheduled
+    """
+
+    def __init__(self, deadline, payload, seq):
+        """ Initializes a pending timer. """
+        self.deadline = deadline
+        self.payload = payload
+        self.cancelled = False
+        self.fired = False
+        self._seq = seq
+
+    def __str__(self):
+        """ Returns a string representation of the timer. """
+        return "timer: deadline = " + str(self.deadline) + ", payload = " + str(self.payload)
+
+class DeadlineScheduler(object):
+    """ Scheduler of timeouts, built on a MinHeap ordered by deadline, with O(1) cancellation.
+
+    cancel() only marks the timer as cancelled (a tombstone); cancelled timers are skipped when they reach the top of the heap.
+    When tombstones make up more than compact_ratio of the heap, the heap is rebuilt from the live timers in O(n),
+    so memory stays proportional to the number of live timers even if most timers are cancelled.
+
+    Attributes:
+        (class) compact_ratio = fraction of tombstones in the heap that triggers a compaction
+        _heap = MinHeap of Timers, keyed by (deadline, scheduling order)
+        _dead = number of cancelled timers still in the heap
+        _seq = number of timers scheduled so far
+        _compactions = number of compactions done so far
+    """
+
+    compact_ratio = 0.5
+
+    def __init__(self):
+        """ Initializes an empty scheduler. """
+        self._heap = MinHeap(key = lambda t: (t.deadline, t._seq))
+        self._dead = 0
+        self._seq = 0
+        self._compactions = 0
+
+    def schedule(self, deadline, payload = None):
+        """ Schedules a payload to become due at a given deadline, in O(lg n). Returns the Timer handle. """
+        timer = Timer(deadline, payload, self._seq)
+        self._seq += 1
+        self._heap.insert(timer)
+        return timer
+
+    def cancel(self, timer):
+        """ Cancels a pending timer in O(1), amortized over compactions. Returns False if it had already fired or been cancelled. """
+        if timer.cancelled or timer.fired: return False
+
+        timer.cancelled = True
+        self._dead += 1
+        self._checkCompact()
+        return True
+
+    def popDue(self, now):
+        """ Removes and returns the payloads of all timers with deadline <= now, in deadline order. Skips cancelled timers. """
+        due = []
+        heap = self._heap
+        while len(heap) > 0 and heap.minimum().deadline <= now:
+            timer = heap.extractMin()
+            if timer.cancelled:
+                self._dead -= 1
+            else:
+                timer.fired = True
+                due.append(timer.payload)
+        self._checkCompact()
+        return due
+
+    def nextDeadline(self):
+        """ Returns the earliest deadline of the pending timers, or None if there are none. Drops cancelled timers from the top of the heap. """
+        heap = self._heap
+        while len(heap) > 0 and heap.minimum().cancelled:
+            heap.extractMin()
+            self._dead -= 1
+        if len(heap) == 0: return None
+        else: return heap.minimum().deadline
+
+    def compactions(self):
+        """ Returns the number of compactions done so far. """
+        return self._compactions
+
+    def _checkCompact(self):
+        """ Compacts the heap if tombstones make up more than compact_ratio of it. """
+        if self._dead > self.compact_ratio * len(self._heap):
+            self._compact()
+
+    def _compact(self):
+        """ Rebuilds the heap from the live timers only, in O(n). """
+        self._heap.createMinHeap([t for t in self._heap._items if not t.cancelled])
+        self._dead = 0
+        self._compactions += 1
+
+    def __len__(self):
+        """ Returns the number of pending timers, excluding cancelled ones. """
+        return len(self._heap) - self._dead
@@ -1,3 +1,15 @@
+from array import array
+import bisect
+import ctypes
+import mmap
+import struct
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 def binarySearch(s_ar, target):
     """
@@ -29,18 +41,149 @@ def binarySearch(s_ar, target):
 
         mid = (low + high) // 2    
 
+def bisectLeft(s_ar, target, low = 0, high = None):
+    """
+    Returns the first index in s_ar[low:high] whose item is >= target, or high if there is none. With duplicates, this is the index of the first equal item.
+    type s_ar: List[], must be pre-sorted and items must be comparable
+    type target: any object comparable to the items in s_arr
+    rtype: int
+    """
+    if high is None: high = len(s_ar)
+
+    while low < high:
+        mid = (low + high) // 2
+        if s_ar[mid] < target:
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
+def bisectRight(s_ar, target, low = 0, high = None):
+    """
+    Returns the first index in s_ar[low:high] whose item is > target, or high if there is none. With duplicates, this is one past the last equal item.
+    type s_ar: List[], must be pre-sorted and items must be comparable
+    type target: any object comparable to the items in s_arr
+    rtype: int
+    """
+    if high is None: high = len(s_ar)
+
+    while low < high:
+        mid = (low + high) // 2
+        if target < s_ar[mid]:
+            high = mid
+        else:
+            low = mid + 1
+    return low
+
+def gallopLeft(s_ar, target, low = 0):
+    """
+    Returns the first index >= low whose item is >= target, like bisectLeft, but searches outwards from low in exponentially growing steps.
+    Takes O(lg d), where d is the distance from low to the result, so it is cheap when the result is close to low.
+    type s_ar: List[], must be pre-sorted and items must be comparable
+    type target: any object comparable to the items in s_arr; all items before index low must be < target
+    rtype: int
+    """
+    n = len(s_ar)
+    high = low
+    step = 1
+    while high < n and s_ar[high] < target:
+        low = high + 1
+        high = low + step
+        step *= 2
+    return bisectLeft(s_ar, target, low, min(high, n))
+
+def _mergeSorted(s_ar, batch):
+    """
+    Returns a new sorted list with the values of both sorted arrays, merged in one linear pass.
+    type s_ar: List[], pre-sorted
+    type batch: List[], pre-sorted
+    rtype: List[]
+    """
+    merged = []
+    i, j = 0, 0
+    while i < len(s_ar) and j < len(batch):
+        if batch[j] < s_ar[i]:
+            merged.append(batch[j])
+            j += 1
+        else:
+            merged.append(s_ar[i])
+            i += 1
+    merged.extend(s_ar[i:])
+    merged.extend(batch[j:])
+    return merged
+
+def _subtractSorted(s_ar, batch):
+    """
+    Returns a new sorted list with one instance of each value in batch removed from s_ar, in one linear pass. Values of batch missing from s_ar are ignored.
+    type s_ar: List[], pre-sorted
+    type batch: List[], pre-sorted
+    rtype: List[]
+    """
+    kept = []
+    i, j = 0, 0
+    while i < len(s_ar) and j < len(batch):
+        if s_ar[i] < batch[j]:
+            kept.append(s_ar[i])
+            i += 1
+        elif s_ar[i] == batch[j]:
+            i += 1
+            j += 1
+        else:
+            j += 1
+    kept.extend(s_ar[i:])
+    return kept
+
+def _insertAt(s_ar, i, value):
+    """ Inserts value at index i of an array, shifting the later items up by one. """
+    s_ar.append(None)
+    for j in range(len(s_ar)-2,i-1,-1):
+        s_ar[j+1] = s_ar[j]
+    s_ar[i] = value
+
+def _deleteAt(s_ar, i):
+    """ Deletes the item at index i of an array, shifting the later items down by one. """
+    for j in range(i,len(s_ar)-1):
+        s_ar[j] = s_ar[j+1]
+    s_ar.pop()
+
+def _moveTo(s_ar, k, i, value):
+    """ Overwrites the item at index k with value, which belongs at insertion point i; shifts only the items between k and i. """
+    if i > k:
+        for j in range(k,i-1):
+            s_ar[j] = s_ar[j+1]
+        s_ar[i-1] = value
+    else:
+        for j in range(k,i,-1):
+            s_ar[j] = s_ar[j-1]
+        s_ar[i] = value
+
 class SortedArray(object):
     """ Simple implementation of an always-sorted array.
 
     Modification of values directly is not supported. Use insert() or delete() instead.
+    With a key function, values are ordered by key(value). Each key is computed once when its value is inserted and stored in _k,
+    parallel to _v, so searches compare the raw keys directly. The bounds and queries passed to bisectLeft, bisectRight, irange,
+    countRange and lookupSorted are then keys, while insert, delete and index take values.
 
     Attributes:
         _v = array of values contained within the SortedArray
+        _key = key function used to order the values, or None to compare the values themselves
+        _k = array of keys, parallel to _v, or None if there is no key function
     """
-    
-    def __init__(self, values = None):
-        """ Initializes an instance with optional array of values, sorting them. """
-        if values:
+
+    _key = None
+    _k = None
+
+    def __init__(self, values = None, key = None):
+        """ Initializes an instance with optional array of values, sorting them, and optional key function. """
+        self._key = key
+        if key is not None:
+            values = list(values) if values else []
+            keys = [key(v) for v in values]
+            order = sorted(range(len(values)), key = keys.__getitem__)
+            self._v = [values[i] for i in order]
+            self._k = [keys[i] for i in order]
+        elif values:
             self._v = sorted(values)
         else:
             self._v = []
@@ -49,33 +192,180 @@ class SortedArray(object):
         
     def insert(self, value):
         """ Inserts a new value into the array. Finds the insertion point in O(lg n) but may still require O(n) shifts. """
-        i = binarySearch(self._v, value)
-
-        self._v.append(None)
-        for j in range(len(self._v)-2,i-1,-1):
-            self._v[j+1] = self._v[j]
-        self._v[i] = value
+        if self._key is None:
+            i = binarySearch(self._v, value)
+        else:
+            k = self._key(value)
+            i = binarySearch(self._k, k)
+            _insertAt(self._k, i, k)
+        _insertAt(self._v, i, value)
         
         self.__checkRep()
     
+    def insertMany(self, values):
+        """ Inserts an iterable of values into the array. Sorts the batch and merges it with the existing values in one O(n + k lg k) pass. """
+        if self._key is not None:
+            self._insertManyKeyed(list(values))
+            return
+
+        batch = sorted(values)
+        if not batch: return
+
+        self._v = _mergeSorted(self._v, batch)
+
+        self.__checkRep()
+
     def delete(self, value):
         """ Deletes a value into the array. Does nothing if value does not exist. Finds the element in O(lg n) but may still require O(n) shifts. """
-        i = binarySearch(self._v, value)
+        i = self.index(value)
 
-        if i < len(self._v) and self._v[i] == value:
-            for j in range(i,len(self._v)-1):
-                self._v[j] = self._v[j+1]
-            self._v.pop()
+        if i is not None:
+            _deleteAt(self._v, i)
+            if self._key is not None:
+                _deleteAt(self._k, i)
         
         self.__checkRep()
     
+    def deleteMany(self, values):
+        """ Deletes an iterable of values from the array, one instance per value given. Values that do not exist are ignored. Runs in O(n + k lg k). """
+        if self._key is not None:
+            self._deleteManyKeyed(values)
+            return
+
+        batch = sorted(values)
+        if not batch: return
+
+        self._v = _subtractSorted(self._v, batch)
+
+        self.__checkRep()
+
     def index(self, value):
         """ Returns the index of a given value in the array, or None if the value is not found. """
-        i = binarySearch(self._v, value)
+        if self._key is None:
+            i = binarySearch(self._v, value)
 
-        if i < len(self._v) and self._v[i] == value:
-            return i
-        else: return None   
+            if i < len(self._v) and self._v[i] == value:
+                return i
+            else: return None   
+
+        # with a key function, scan the values sharing value's key
+        k = self._key(value)
+        i = bisectLeft(self._k, k)
+        while i < len(self._k) and self._k[i] == k:
+            if self._v[i] == value:
+                return i
+            i += 1
+        return None
+
+    def lookupSorted(self, queries):
+        """ Returns the index of the first instance of each query in the array, or -1 where it is not found, as an array.array('l').
+        Sorted runs of queries are answered by galloping from the previous result, so m sorted queries take O(m lg(n/m)) instead of O(m lg n).
+        Whenever a query is smaller than the one before it, the search restarts from the beginning of the array.
+        """
+        v = self._searchKeys()
+        n = len(v)
+        result = array('l')
+        i = 0
+        prev = None
+        for q in queries:
+            if prev is not None and q < prev: i = 0
+            i = gallopLeft(v, q, i)
+            if i < n and v[i] == q: result.append(i)
+            else: result.append(-1)
+            prev = q
+        return result
+
+    def bisectLeft(self, value):
+        """ Returns the index of the first element >= value, i.e. the leftmost insertion point for value. """
+        return bisectLeft(self._searchKeys(), value)
+
+    def bisectRight(self, value):
+        """ Returns the index of the first element > value, i.e. the rightmost insertion point for value. """
+        return bisectRight(self._searchKeys(), value)
+
+    def countRange(self, lo = None, hi = None, inclusive = (True, True)):
+        """ Returns the number of elements between lo and hi in O(lg n). A bound of None is unbounded; inclusive gives (include lo, include hi). """
+        start, stop = self._rangeBounds(lo, hi, inclusive)
+        return stop - start
+
+    def irange(self, lo = None, hi = None, inclusive = (True, True), reverse = False):
+        """ Lazily yields the elements between lo and hi, in sorted order or in reverse. A bound of None is unbounded; inclusive gives (include lo, include hi).
+        Finds the bounds in O(lg n) and does not copy the array. The array should not be modified while iterating.
+        """
+        start, stop = self._rangeBounds(lo, hi, inclusive)
+        v = self._v
+        if reverse:
+            i = stop - 1
+            while i >= start:
+                yield v[i]
+                i -= 1
+        else:
+            i = start
+            while i < stop:
+                yield v[i]
+                i += 1
+
+    def _rangeBounds(self, lo, hi, inclusive):
+        """ Returns the (start, stop) indexes of the elements between lo and hi, for irange and countRange. """
+        if lo is None: start = 0
+        elif inclusive[0]: start = self.bisectLeft(lo)
+        else: start = self.bisectRight(lo)
+
+        if hi is None: stop = len(self)
+        elif inclusive[1]: stop = self.bisectRight(hi)
+        else: stop = self.bisectLeft(hi)
+
+        return start, max(start, stop)
+
+    def _searchKeys(self):
+        """ Returns the sorted array that searches run over: the keys if there is a key function, and the values otherwise. """
+        if self._key is None: return self._v
+        else: return self._k
+
+    def _insertManyKeyed(self, batch):
+        """ insertMany for an array with a key function: merges the batch by key, computing each key once. """
+        if not batch: return
+
+        keys = [self._key(v) for v in batch]
+        order = sorted(range(len(batch)), key = keys.__getitem__)
+
+        merged_v, merged_k = [], []
+        i, j = 0, 0
+        while i < len(self._k) and j < len(order):
+            if keys[order[j]] < self._k[i]:
+                merged_v.append(batch[order[j]])
+                merged_k.append(keys[order[j]])
+                j += 1
+            else:
+                merged_v.append(self._v[i])
+                merged_k.append(self._k[i])
+                i += 1
+        merged_v.extend(self._v[i:])
+        merged_k.extend(self._k[i:])
+        for o in order[j:]:
+            merged_v.append(batch[o])
+            merged_k.append(keys[o])
+        self._v, self._k = merged_v, merged_k
+
+        self.__checkRep()
+
+    def _deleteManyKeyed(self, batch):
+        """ deleteMany for an array with a key function: marks one matching index per value in O(lg n) each, then compacts in one pass. """
+        dead = set()
+        for value in batch:
+            k = self._key(value)
+            i = bisectLeft(self._k, k)
+            while i < len(self._k) and self._k[i] == k:
+                if i not in dead and self._v[i] == value:
+                    dead.add(i)
+                    break
+                i += 1
+        if not dead: return
+
+        self._v = [v for i, v in enumerate(self._v) if i not in dead]
+        self._k = [k for i, k in enumerate(self._k) if i not in dead]
+
+        self.__checkRep()
 
     def minimum(self):
         """ Returns the minimum element of the array. """
@@ -87,6 +377,11 @@ class SortedArray(object):
         if len(self._v) == 0: return None
         else: return self._v[-1]
         
+    @classmethod
+    def openMmap(cls, path):
+        """ Opens a file written by NumericSortedArray.save() as a read-only MappedSortedArray, served straight from a memory map. """
+        return MappedSortedArray(path)
+
     def __len__(self):
         """ Returns the length of the array. """
         return len(self._v)
@@ -96,9 +391,19 @@ class SortedArray(object):
         return self._v[k]
 
     def __setitem__(self, k, v):
-        """ Supports using array[i] = v to overwrite a value; maintains sorted order. """
-        self.delete(self._v[k])
-        self.insert(v)
+        """ Supports using array[i] = v to overwrite a value; maintains sorted order. Only the values between the old and new positions are shifted. """
+        if k < 0: k += len(self._v)
+        if k < 0 or k >= len(self._v): raise IndexError("SortedArray index out of range")
+
+        if self._key is None:
+            i = binarySearch(self._v, v)
+        else:
+            key = self._key(v)
+            i = binarySearch(self._k, key)
+            _moveTo(self._k, k, i, key)
+        _moveTo(self._v, k, i, v)
+
+        self.__checkRep()
         
     def __iter__(self):
         """ Returns an iterator over the values. """
@@ -111,8 +416,646 @@ class SortedArray(object):
     def __checkRep(self):
         """ Checks the representation invariant for the array, namely that it is always sorted. Used for debugging only. """
         if False: # set to True for debugging
-            for i, n in enumerate(self._v):
+            keys = self._searchKeys()
+            for i, n in enumerate(keys):
                 if i == 0: continue
-                if n < self._v[i-1]: 
+                if n < keys[i-1]: 
                     print "Invariant breach: element",n,"at index",i,"out of order"
+            if self._key is not None and len(self._k) != len(self._v):
+                print "Invariant breach:",len(self._v),"values but",len(self._k),"keys"
+
+
+
+class BlockedSortedArray(SortedArray):
+    """ Always-sorted array stored as a list of bounded-size sorted chunks. Inherits from SortedArray.
+
+    Each chunk holds between load/2 and 2*load values (apart from a lone last chunk), so insert and delete only shift O(load) values
+    and find the chunk in O(lg n) through the list of chunk maxima. With load ~ sqrt(n), insert and delete run in O(sqrt n).
+    Positional access (array[i], index, bisectLeft / bisectRight, irange, lookupSorted) uses a cumulative-length index, searched in O(lg n).
+    A write only records the first chunk it touched; the next positional access refreshes the index from that chunk onward, which costs
+    O(n / load) after a write near the start (about n / 1000 steps with the default load) but O(1) after one near the end.
+
+    Attributes:
+        (class) load = target number of values per chunk
+        _v = list of sorted chunks; the concatenation of the chunks is the sorted array
+        _maxes = maximum value of each chunk, used to find the chunk for a given value
+        _offsets = number of values before each chunk; entries from chunk _stale onward may be out of date
+        _stale = index of the first chunk whose entry in _offsets may be out of date, or None if _offsets is up to date
+        _len = total number of values in the array
+    """
+
+    load = 1000
+
+    def __init__(self, values = None):
+        """ Initializes an instance with optional array of values, sorting them. """
+        if values:
+            self._build(sorted(values))
+        else:
+            self._build([])
+
+        self.__checkRep()
+
+    def insert(self, value):
+        """ Inserts a new value into the array. Finds the chunk in O(lg n) and shifts at most O(load) values. """
+        if self._len == 0:
+            self._build([value])
+            return
+
+        c = binarySearch(self._maxes, value)
+        if c == len(self._maxes): c -= 1
+
+        chunk = self._v[c]
+        chunk.insert(binarySearch(chunk, value), value)
+        self._maxes[c] = chunk[-1]
+        self._len += 1
+
+        if len(chunk) > 2 * self.load:
+            self._v[c:c+1] = [chunk[:self.load], chunk[self.load:]]
+            self._maxes[c:c+1] = [self._v[c][-1], self._v[c+1][-1]]
+        self._invalidate(c)
+
+        self.__checkRep()
+
+    def insertMany(self, values):
+        """ Inserts an iterable of values into the array, merging the sorted batch with the existing values and re-chunking. Runs in O(n + k lg k). """
+        batch = sorted(values)
+        if not batch: return
+
+        self._build(_mergeSorted(list(self), batch))
+
+    def delete(self, value):
+        """ Deletes a value from the array. Does nothing if value does not exist. Finds the value in O(lg n) and shifts at most O(load) values. """
+        c = binarySearch(self._maxes, value)
+        if c == len(self._maxes): return
+
+        chunk = self._v[c]
+        i = binarySearch(chunk, value)
+        if i >= len(chunk) or chunk[i] != value: return
+
+        del chunk[i]
+        self._len -= 1
+
+        if len(chunk) == 0:
+            del self._v[c]
+            del self._maxes[c]
+        else:
+            self._maxes[c] = chunk[-1]
+            if len(chunk) < self.load // 2 and len(self._v) > 1:
+                self._mergeChunk(c)
+        self._invalidate(c)
+
+        self.__checkRep()
+
+    def deleteMany(self, values):
+        """ Deletes an iterable of values from the array, one instance per value given. Runs in O(n + k lg k). """
+        batch = sorted(values)
+        if not batch: return
+
+        self._build(_subtractSorted(list(self), batch))
+
+    def index(self, value):
+        """ Returns the index of a given value in the array, or None if the value is not found. """
+        c = binarySearch(self._maxes, value)
+        if c == len(self._maxes): return None
+
+        chunk = self._v[c]
+        i = binarySearch(chunk, value)
+        if i < len(chunk) and chunk[i] == value:
+            return self._getOffsets()[c] + i
+        else: return None
+
+    def bisectLeft(self, value):
+        """ Returns the index of the first element >= value. Finds the chunk in O(lg n) and bisects within it. """
+        c = bisectLeft(self._maxes, value)
+        if c == len(self._maxes): return self._len
+        return self._getOffsets()[c] + bisectLeft(self._v[c], value)
+
+    def bisectRight(self, value):
+        """ Returns the index of the first element > value. Finds the chunk in O(lg n) and bisects within it. """
+        c = bisectRight(self._maxes, value)
+        if c == len(self._maxes): return self._len
+        return self._getOffsets()[c] + bisectRight(self._v[c], value)
+
+    def lookupSorted(self, queries):
+        """ Returns the index of the first instance of each query in the array, or -1 where it is not found, as an array.array('l').
+        Gallops over the chunk maxima and then within the chunk, starting from the previous result. See SortedArray.lookupSorted.
+        """
+        offsets = self._getOffsets()
+        result = array('l')
+        c, i = 0, 0
+        prev = None
+        for q in queries:
+            if prev is not None and q < prev: c, i = 0, 0
+            prev = q
+
+            new_c = gallopLeft(self._maxes, q, c)
+            if new_c != c: c, i = new_c, 0
+            if c == len(self._maxes):
+                result.append(-1)
+                continue
+
+            chunk = self._v[c]
+            i = gallopLeft(chunk, q, i)
+            if chunk[i] == q: result.append(offsets[c] + i)
+            else: result.append(-1)
+        return result
+
+    def irange(self, lo = None, hi = None, inclusive = (True, True), reverse = False):
+        """ Lazily yields the elements between lo and hi, walking the chunks in place. See SortedArray.irange. """
+        start, stop = self._rangeBounds(lo, hi, inclusive)
+        remaining = stop - start
+        if remaining == 0: return
+
+        if reverse:
+            c, i = self._position(stop - 1)
+            while True:
+                chunk = self._v[c]
+                while i >= 0:
+                    yield chunk[i]
+                    remaining -= 1
+                    if remaining == 0: return
+                    i -= 1
+                c -= 1
+                i = len(self._v[c]) - 1
+        else:
+            c, i = self._position(start)
+            while True:
+                chunk = self._v[c]
+                while i < len(chunk):
+                    yield chunk[i]
+                    remaining -= 1
+                    if remaining == 0: return
+                    i += 1
+                c += 1
+                i = 0
+
+    def minimum(self):
+        """ Returns the minimum element of the array. """
+        if self._len == 0: return None
+        else: return self._v[0][0]
+
+    def maximum(self):
+        """ Returns the maximum element of the array. """
+        if self._len == 0: return None
+        else: return self._maxes[-1]
+
+    def __len__(self):
+        """ Returns the length of the array. """
+        return self._len
+
+    def __getitem__(self, k):
+        """ Supports using array[i] to get a value, in O(lg n) through the cumulative-length index. Slices return a list. """
+        if isinstance(k, slice):
+            return list(self)[k]
+
+        c, i = self._position(k)
+        return self._v[c][i]
+
+    def __setitem__(self, k, v):
+        """ Supports using array[i] = v to overwrite a value; maintains sorted order. """
+        c, i = self._position(k)
+        self.delete(self._v[c][i])
+        self.insert(v)
+
+    def __iter__(self):
+        """ Returns an iterator over the values. """
+        for chunk in self._v:
+            for value in chunk:
+                yield value
+
+    def __str__(self):
+        """ Returns a string representation of the array. """
+        return str(list(self))
+
+    def _build(self, s_ar):
+        """ Rebuilds the chunks from a given sorted list of values. """
+        self._v = [s_ar[i:i+self.load] for i in range(0, len(s_ar), self.load)]
+        self._maxes = [chunk[-1] for chunk in self._v]
+        self._offsets = []
+        self._stale = 0
+        self._len = len(s_ar)
+
+    def _mergeChunk(self, c):
+        """ Merges the undersized chunk at index c with a neighbour, splitting the result again if it is too large. """
+        if c == len(self._v) - 1: c -= 1
+
+        chunk = self._v[c] + self._v[c+1]
+        if len(chunk) > 2 * self.load:
+            half = len(chunk) // 2
+            self._v[c:c+2] = [chunk[:half], chunk[half:]]
+            self._maxes[c:c+2] = [chunk[half-1], chunk[-1]]
+        else:
+            self._v[c:c+2] = [chunk]
+            self._maxes[c:c+2] = [chunk[-1]]
+
+    def _invalidate(self, c):
+        """ Marks the cumulative-length index as out of date from chunk c onward, after a write to chunk c. Earlier chunks are unaffected. """
+        if self._stale is None or c < self._stale:
+            self._stale = c
+
+    def _getOffsets(self):
+        """ Returns the cumulative-length index, first refreshing it from the first chunk a write has touched since the last refresh. """
+        if self._stale is not None:
+            offsets = self._offsets
+            c = self._stale
+            del offsets[c:]
+            if c > 0: total = offsets[-1] + len(self._v[c-1])
+            else: total = 0
+            for i in range(c, len(self._v)):
+                offsets.append(total)
+                total += len(self._v[i])
+            self._stale = None
+        return self._offsets
+
+    def _position(self, k):
+        """ Returns (chunk index, index within chunk) for a given index k into the array. Raises IndexError if k is out of range. """
+        if k < 0: k += self._len
+        if k < 0 or k >= self._len: raise IndexError("SortedArray index out of range")
+
+        offsets = self._getOffsets()
+        c = binarySearch(offsets, k)
+        if c == len(offsets) or offsets[c] != k:
+            c -= 1
+        return c, k - offsets[c]
+
+    def __checkRep(self):
+        """ Checks the representation invariant: chunks are non-empty, sorted, in order, and _maxes / _len / up-to-date _offsets match. Used for debugging only. """
+        if False: # set to True for debugging
+            prev = None
+            total = 0
+            if self._stale is None: stale = len(self._v)
+            else: stale = self._stale
+            for c, chunk in enumerate(self._v):
+                if len(chunk) == 0:
+                    print "Invariant breach: empty chunk at index",c
+                if c < stale and (c >= len(self._offsets) or self._offsets[c] != total):
+                    print "Invariant breach: offset of chunk",c,"should be",total
+                if self._maxes[c] != chunk[-1]:
+                    print "Invariant breach: max of chunk",c,"is",chunk[-1],"but stored as",self._maxes[c]
+                for n in chunk:
+                    if prev is not None and n < prev:
+                        print "Invariant breach: element",n,"in chunk",c,"out of order"
+                    prev = n
+                total += len(chunk)
+            if total != self._len:
+                print "Invariant breach: length",self._len,"but chunks hold",total
+
+
+class NumericSortedArray(SortedArray):
+    """ Always-sorted array of plain numbers, stored in a contiguous typed buffer. Inherits from SortedArray.
+
+    Values are stored unboxed in an array.array of the given typecode (e.g. 'd' for floats, 'l' for ints), which takes the item size
+    per value instead of a pointer plus a full Python object. Insert and delete shift the buffer with a single memmove.
+    Batch lookups through searchSorted / indexMany run as one vectorized call when NumPy is installed, and as a tight C-level bisect loop otherwise.
+
+    Attributes:
+        _v = array.array of values contained within the NumericSortedArray
+    """
+
+    def __init__(self, values = None, typecode = 'd'):
+        """ Initializes an instance with optional iterable of numeric values (such as a list or a NumPy array), sorting them. typecode is any numeric array.array typecode. """
+        if values is not None:
+            self._v = array(typecode, sorted(values))
+        else:
+            self._v = array(typecode)
+
+    def insert(self, value):
+        """ Inserts a new value into the array. Finds the insertion point in O(lg n) and shifts the buffer in one memmove. """
+        self._v.insert(bisect.bisect_left(self._v, value), value)
+
+    def insertMany(self, values):
+        """ Inserts an iterable of values into the array. Sorts the batch and merges it with the existing values in one O(n + k lg k) pass. """
+        batch = sorted(values)
+        if not batch: return
+
+        self._v = array(self._v.typecode, _mergeSorted(self._v, batch))
+
+    def delete(self, value):
+        """ Deletes a value from the array. Does nothing if value does not exist. """
+        i = bisect.bisect_left(self._v, value)
+        if i < len(self._v) and self._v[i] == value:
+            self._v.pop(i)
+
+    def deleteMany(self, values):
+        """ Deletes an iterable of values from the array, one instance per value given. Runs in O(n + k lg k). """
+        batch = sorted(values)
+        if not batch: return
+
+        self._v = array(self._v.typecode, _subtractSorted(self._v, batch))
+
+    def bisectLeft(self, value):
+        """ Returns the index of the first element >= value, using the C-level bisect module. """
+        return bisect.bisect_left(self._v, value)
+
+    def bisectRight(self, value):
+        """ Returns the index of the first element > value, using the C-level bisect module. """
+        return bisect.bisect_right(self._v, value)
+
+    def searchSorted(self, queries, side = "left"):
+        """ Returns the insertion point of each query, as a NumPy array if NumPy is installed and an array.array('l') otherwise.
+        With side = "left" the point is before any equal values, and with side = "right" after them.
+        """
+        if not hasattr(queries, "__len__"): queries = list(queries)
+        if numpy is not None:
+            if len(self._v) == 0: return numpy.zeros(len(queries), dtype = int)
+            return numpy.searchsorted(self._asNumpy(), queries, side)
+
+        if side == "left": search = bisect.bisect_left
+        else: search = bisect.bisect_right
+        v = self._v
+        return array('l', [search(v, q) for q in queries])
+
+    def indexMany(self, queries):
+        """ Returns the index of each query in the array, or -1 where the query is not found, as a compact integer array. """
+        # queries is read twice, so one-shot iterables are materialized first
+        if not hasattr(queries, "__len__"): queries = list(queries)
+        n = len(self._v)
+        points = self.searchSorted(queries)
+
+        if numpy is not None:
+            if n == 0: return points - 1
+            # compared at the queries' own type, so fractional queries never match an integer buffer
+            q = numpy.asarray(queries)
+            found = points < n
+            found[found] = self._asNumpy()[points[found]] == q[found]
+            return numpy.where(found, points, -1)
+
+        v = self._v
+        result = array('l', points)
+        for j, q in enumerate(queries):
+            i = result[j]
+            if i >= n or v[i] != q:
+                result[j] = -1
+        return result
+
+    def save(self, path):
+        """ Writes the array to a file in the binary format read by SortedArray.openMmap(): a 16-byte header followed by the raw buffer.
+        The header holds the magic string, format version, typecode, byte order and number of values; the values are stored in native byte order.
+        """
+        f = open(path, "wb")
+        try:
+            f.write(struct.pack(MappedSortedArray.header, MappedSortedArray.magic, MappedSortedArray.version,
+                                self._v.typecode.encode("ascii"), sys.byteorder == "big", len(self._v)))
+            self._v.tofile(f)
+        finally:
+            f.close()
+
+    def itemSize(self):
+        """ Returns the number of bytes used to store each value. """
+        return self._v.itemsize
+
+    def __str__(self):
+        """ Returns a string representation of the array. """
+        return str(self._v.tolist())
+
+    def _asNumpy(self):
+        """ Returns a NumPy view of the buffer, without copying. Requires NumPy. """
+        return numpy.frombuffer(self._v, dtype = self._v.typecode)
+
+
+class MappedSortedArray(NumericSortedArray):
+    """ Read-only NumericSortedArray served directly from a memory-mapped file written by NumericSortedArray.save(). Inherits from NumericSortedArray.
+
+    Opening the file only reads and checks the header, so it takes O(1) regardless of size. The values are never copied: _v is a ctypes
+    array laid over a copy-on-write memory map, so every process opening the same file shares one copy in the page cache.
+    Supports all of the lookups (index, bisect, irange, lookupSorted, indexMany, minimum, maximum, array[i]); insert and delete raise TypeError.
+
+    Attributes:
+        (class) header = struct format of the file header
+        (class) magic = magic string at the start of the file
+        (class) version = version of the file format
+        _v = ctypes array over the mapped values
+        _map = the underlying mmap object
+        _typecode = array.array typecode of the stored values
+    """
+
+    header = "<4sBcBxQ"
+    magic = b"SARR"
+    version = 1
+
+    _ctypes = {'b': ctypes.c_byte, 'B': ctypes.c_ubyte, 'h': ctypes.c_short, 'H': ctypes.c_ushort,
+               'i': ctypes.c_int, 'I': ctypes.c_uint, 'l': ctypes.c_long, 'L': ctypes.c_ulong,
+               'q': ctypes.c_longlong, 'Q': ctypes.c_ulonglong, 'f': ctypes.c_float, 'd': ctypes.c_double}
+
+    def __init__(self, path):
+        """ Maps the file at the given path. Raises ValueError if the file is not a valid SortedArray file for this platform. """
+        f = open(path, "rb")
+        try:
+            size = struct.calcsize(self.header)
+            fields = f.read(size)
+            if len(fields) != size:
+                raise ValueError("not a SortedArray file: " + str(path))
+            magic, version, typecode, big_endian, n = struct.unpack(self.header, fields)
+            typecode = str(typecode.decode("ascii"))
+
+            if magic != self.magic or version != self.version or typecode not in self._ctypes:
+                raise ValueError("not a SortedArray file: " + str(path))
+            if bool(big_endian) != (sys.byteorder == "big") or ctypes.sizeof(self._ctypes[typecode]) != array(typecode).itemsize:
+                raise ValueError("SortedArray file was written on an incompatible platform: " + str(path))
+
+            self._map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_COPY)
+        finally:
+            f.close()
+
+        if len(self._map) < size + n * array(typecode).itemsize:
+            self._map.close()
+            raise ValueError("SortedArray file is truncated: " + str(path))
+
+        self._typecode = typecode
+        self._v = (self._ctypes[typecode] * n).from_buffer(self._map, size)
+
+    def close(self):
+        """ Unmaps the file. The array must not be used afterwards. """
+        self._v = None
+        self._map.close()
+
+    def insert(self, value):
+        """ Not supported; the mapped array is read-only. """
+        raise TypeError("MappedSortedArray is read-only")
+
+    def insertMany(self, values):
+        """ Not supported; the mapped array is read-only. """
+        raise TypeError("MappedSortedArray is read-only")
+
+    def delete(self, value):
+        """ Not supported; the mapped array is read-only. """
+        raise TypeError("MappedSortedArray is read-only")
+
+    def deleteMany(self, values):
+        """ Not supported; the mapped array is read-only. """
+        raise TypeError("MappedSortedArray is read-only")
+
+    def save(self, path):
+        """ Writes the array to a file in the same binary format. """
+        self._copy().save(path)
+
+    def itemSize(self):
+        """ Returns the number of bytes used to store each value. """
+        return array(self._typecode).itemsize
+
+    def __setitem__(self, k, v):
+        """ Not supported; the mapped array is read-only. """
+        raise TypeError("MappedSortedArray is read-only")
+
+    def __str__(self):
+        """ Returns a string representation of the array. """
+        return str(list(self._v))
+
+    def _copy(self):
+        """ Returns an in-memory NumericSortedArray with the same values. """
+        s_arr = NumericSortedArray(typecode = self._typecode)
+        s_arr._v = array(self._typecode, self._v)
+        return s_arr
+
+    def _asNumpy(self):
+        """ Returns a NumPy view of the mapped values, without copying. Requires NumPy. """
+        return numpy.frombuffer(self._v, dtype = self._typecode)
+
+
+class BufferedSortedArray(SortedArray):
+    """ Always-sorted array that buffers inserts and deletes and merges them into the sorted values lazily. Inherits from SortedArray.
+
+    Inserts are appended to an unsorted buffer, and deletes of values in the sorted part are recorded as tombstones, both in O(1) plus
+    O(lg n) to check the value exists. Pending changes are merged in one linear pass (see insertMany / deleteMany) when they exceed
+    buffer_size, or as soon as a read needs sorted order, so each merge moves the array once for up to buffer_size changes.
+    Values must be hashable, since tombstones are kept in a dict.
+
+    Attributes:
+        (class) buffer_size = number of pending inserts and deletes that triggers a merge; can be overridden per instance
+        _v = sorted array of merged values
+        _buffer = unsorted list of values inserted since the last merge
+        _tombstones = dict of value -> number of instances deleted from _v since the last merge
+        _dead = total number of tombstones
+        _merges = number of merges done so far
+    """
+
+    buffer_size = 1000
+
+    def __init__(self, values = None, buffer_size = None):
+        """ Initializes an instance with optional array of values, sorting them, and optional merge threshold. """
+        super(BufferedSortedArray, self).__init__(values)
+        if buffer_size is not None:
+            self.buffer_size = buffer_size
+        self._buffer = []
+        self._tombstones = {}
+        self._dead = 0
+        self._merges = 0
+
+    def insert(self, value):
+        """ Inserts a new value into the buffer. O(1), apart from the merge once the buffer is full. """
+        self._buffer.append(value)
+        self._checkBuffer()
+
+    def insertMany(self, values):
+        """ Inserts an iterable of values into the buffer, merging once at the end if the buffer is full. """
+        self._buffer.extend(values)
+        self._checkBuffer()
+
+    def delete(self, value):
+        """ Deletes a value from the array. Does nothing if value does not exist.
+        Values still in the buffer are removed from it; values already merged are tombstoned, in O(lg n + buffer_size).
+        """
+        if value in self._buffer:
+            self._buffer.remove(value)
+            return
+
+        count = bisectRight(self._v, value) - bisectLeft(self._v, value)
+        if count > self._tombstones.get(value, 0):
+            self._tombstones[value] = self._tombstones.get(value, 0) + 1
+            self._dead += 1
+            self._checkBuffer()
+
+    def deleteMany(self, values):
+        """ Merges any pending changes, then deletes an iterable of values in one linear pass. """
+        self.flush()
+        super(BufferedSortedArray, self).deleteMany(values)
+
+    def flush(self):
+        """ Merges the buffer and tombstones into the sorted values, in one linear pass. Does nothing if there are no pending changes. """
+        if not self._buffer and not self._dead: return
+
+        if self._dead:
+            dead = []
+            for value, count in self._tombstones.items():
+                dead.extend([value] * count)
+            self._v = _subtractSorted(self._v, sorted(dead))
+            self._tombstones = {}
+            self._dead = 0
+
+        if self._buffer:
+            self._v = _mergeSorted(self._v, sorted(self._buffer))
+            self._buffer = []
+
+        self._merges += 1
+
+    def mergeCount(self):
+        """ Returns the number of merges done so far, for tuning buffer_size. """
+        return self._merges
+
+    def pending(self):
+        """ Returns the number of inserts and deletes waiting to be merged. """
+        return len(self._buffer) + self._dead
+
+    def index(self, value):
+        """ Returns the index of a given value in the array, or None if the value is not found. Merges pending changes first. """
+        self.flush()
+        return super(BufferedSortedArray, self).index(value)
+
+    def lookupSorted(self, queries):
+        """ Returns the index of each query in the array, or -1 where it is not found. Merges pending changes first. """
+        self.flush()
+        return super(BufferedSortedArray, self).lookupSorted(queries)
+
+    def bisectLeft(self, value):
+        """ Returns the index of the first element >= value. Merges pending changes first. """
+        self.flush()
+        return super(BufferedSortedArray, self).bisectLeft(value)
+
+    def bisectRight(self, value):
+        """ Returns the index of the first element > value. Merges pending changes first. """
+        self.flush()
+        return super(BufferedSortedArray, self).bisectRight(value)
+
+    def irange(self, lo = None, hi = None, inclusive = (True, True), reverse = False):
+        """ Lazily yields the elements between lo and hi. Merges pending changes first. """
+        self.flush()
+        return super(BufferedSortedArray, self).irange(lo, hi, inclusive, reverse)
+
+    def minimum(self):
+        """ Returns the minimum element of the array. Merges pending changes first. """
+        self.flush()
+        return super(BufferedSortedArray, self).minimum()
+
+    def maximum(self):
+        """ Returns the maximum element of the array. Merges pending changes first. """
+        self.flush()
+        return super(BufferedSortedArray, self).maximum()
+
+    def __len__(self):
+        """ Returns the length of the array, including pending changes. Does not merge. """
+        return len(self._v) + len(self._buffer) - self._dead
+
+    def __getitem__(self, k):
+        """ Supports using array[i] to get a value. Merges pending changes first. """
+        self.flush()
+        return super(BufferedSortedArray, self).__getitem__(k)
+
+    def __setitem__(self, k, v):
+        """ Supports using array[i] = v to overwrite a value; maintains sorted order. Merges pending changes first. """
+        self.flush()
+        super(BufferedSortedArray, self).__setitem__(k, v)
+
+    def __iter__(self):
+        """ Returns an iterator over the values. Merges pending changes first. """
+        self.flush()
+        return super(BufferedSortedArray, self).__iter__()
+
+    def __str__(self):
+        """ Returns a string representation of the array. Merges pending changes first. """
+        self.flush()
+        return super(BufferedSortedArray, self).__str__()
 
+    def _checkBuffer(self):
+        """ Merges the pending changes if there are more than buffer_size of them. """
+        if len(self._buffer) + self._dead > self.buffer_size:
+            self.flush()
@@ -1,12 +1,20 @@
-from heap import Heap, MinHeap, MaxHeap
-from sorted_array import SortedArray
-from hash_table import HashFunction, HashTable
+from heap import Heap, MinHeap, MaxHeap, IndexedHeap, DaryHeap, TopK, topK, merge, PairingHeap, RadixHeap, MinMaxHeap, PayloadHeap
+from sorted_array import SortedArray, BlockedSortedArray, NumericSortedArray, BufferedSortedArray
+from hash_table import HashFunction, HashTable, IncrementalHashTable, OpenHashTable, KeyValuePair
+from priority_queue import ConcurrentPriorityQueue, AsyncPriorityQueue, DeadlineScheduler, Empty
+import priority_queue
 from BST import BST, Node
 from AVL_tree import AVL
 
 import random
 import datetime
+import itertools
 import math
+import sys
+import bisect
+import os
+import tempfile
+import threading
 
 def heapCompare(heap, ar1):
     """
@@ -24,13 +32,13 @@ def heapCompare(heap, ar1):
 
     return True
     
-def heapRandomTest(size, min_heap):
+def heapRandomTest(size, min_heap, heap = None):
     """
-    Creates a heap of a random size and tests elements versus array with same data.
+    Creates a heap (unless an empty one is passed) of a random size and tests elements versus array with same data.
     Returns True if the heap meets all tests.
-    For debugging the Heap class.
+    For debugging the Heap class and subclasses.
     """
-    heap = Heap(min_heap)
+    if heap is None: heap = Heap(min_heap)
     ar = []
 
     # insertions
@@ -89,14 +97,14 @@ def heapRandomTest(size, min_heap):
     
     return True
 
-def heapRandomSort(size, min_heap):
+def heapRandomSort(size, min_heap, heap = None):
     """
-    Tests heap extractAll method vs sorting an array, after random insertions and deletions.
+    Tests heap (new, unless an empty one is passed) extractAll method vs sorting an array, after random insertions and deletions.
     Returns True if the heap output is the same as the sorted array, and False otherwise.
-    For testing Heap class.
+    For testing Heap class and subclasses.
     """
     ar = []
-    heap = Heap(min_heap)
+    if heap is None: heap = Heap(min_heap)
 
     # insertions
     for i in range(size):
@@ -156,6 +164,80 @@ def heapFullTest():
         else:
             print "Test",i,"failed"
 
+    print("\nTesting DaryHeap: sorting and general, d = 3, 4, 8, and d < 2 rejected")
+    for i in range(1,21):
+        passed = True
+        for d in [3, 4, 8]:
+            for min_heap in [True, False]:
+                passed = passed and heapRandomSort(250, min_heap, DaryHeap(d, min_heap))
+                passed = passed and heapRandomTest(250, min_heap, DaryHeap(d, min_heap))
+        passed = passed and daryHeapArityTest()
+        if passed:
+            print "Test",i,"successful"
+        else:
+            print "Test",i,"failed"
+
+    print("\nTesting Heap: insertMany, pushPop, replace, iterSorted, iterExtract, PayloadHeap, topK and merge")
+    for i in range(1,21):
+        passed = heapReplaceTest(100, True) and heapReplaceTest(100, False)
+        passed = passed and heapIterTest(200, True) and heapIterTest(200, False) and heapIterTest(100, True, DaryHeap(3, True))
+        passed = passed and payloadHeapRandomTest(500, True) and payloadHeapRandomTest(500, False, 'l')
+        passed = passed and heapInsertManyTest(200, True) and heapInsertManyTest(200, False)
+        passed = passed and topKTest(1000, random.randint(0,50)) and topKTest(20, 50)
+        passed = passed and heapMergeTest(random.randint(0,10), 100) and heapMergeTest(1, 50)
+        if passed:
+            print "Test",i,"successful"
+        else:
+            print "Test",i,"failed"
+
+    print("\nTesting PairingHeap: random operations")
+    for i in range(1,21):
+        if pairingHeapRandomTest(1000):
+            print "Test",i,"successful"
+        else:
+            print "Test",i,"failed"
+
+    print("\nTesting MinMaxHeap: random operations")
+    for i in range(1,21):
+        if minMaxHeapRandomTest(1000):
+            print "Test",i,"successful"
+        else:
+            print "Test",i,"failed"
+
+    print("\nTesting RadixHeap: monotone operations")
+    for i in range(1,21):
+        if radixHeapRandomTest(2000):
+            print "Test",i,"successful"
+        else:
+            print "Test",i,"failed"
+
+    print("\nTesting IndexedHeap: random operations")
+    for i in range(1,21):
+        if indexedHeapRandomTest(250, True) and indexedHeapRandomTest(250, False):
+            print "Test",i,"successful"
+        else:
+            print "Test",i,"failed"
+
+    print("\nTesting ConcurrentPriorityQueue: threads")
+    for i in range(1,6):
+        if concurrentQueueTest(4, 4, 500) and concurrentQueueEmptyTest():
+            print "Test",i,"successful"
+        else:
+            print "Test",i,"failed"
+
+    print("\nTesting DeadlineScheduler: random operations")
+    for i in range(1,21):
+        if deadlineSchedulerTest(1000):
+            print "Test",i,"successful"
+        else:
+            print "Test",i,"failed"
+
+    print("\nTesting AsyncPriorityQueue")
+    result = asyncQueueTest()
+    if result is None: print "asyncio not available"
+    elif result: print "Test successful"
+    else: print "Test failed"
+
     print("\nTesting MinHeap: other operations")
     ar = [1, 4, 501, -200, 32, 7, 65, -1, 20000, -34, 17]
     min_heap = MinHeap()
@@ -175,14 +257,629 @@ def heapFullTest():
     print "Max: ar", max(ar), "min_heap", min_heap.maximum(), "max_heap", max_heap.maximum()
     print "Min: ar", min(ar), "min_heap", min_heap.minimum(), "max_heap", max_heap.minimum()
 
-def sortedArrayRandomTest(size):
+def indexedHeapRandomTest(size, min_heap):
+    """
+    Fills an IndexedHeap with random items and priorities, then updates, deletes and extracts them, checking against a dictionary.
+    Returns True if the heap matches the dictionary throughout and extracts items in priority order, and False otherwise.
+    For testing the IndexedHeap class.
+    """
+    heap = IndexedHeap(min_heap)
+    dic = {}
+    heap.createHeap((i, random.randint(-9999,9999)) for i in range(size//2))
+    for i in range(size//2):
+        dic[i] = heap.priority(i)
+    for i in range(size//2, 3*size//4):
+        p = random.randint(-9999,9999)
+        heap.insert(i, p)
+        dic[i] = p
+    batch = [(i, random.randint(-9999,9999)) for i in range(3*size//4, size)]
+    heap.insertMany(batch)
+    dic.update(batch)
+
+    # updates, in both directions
+    for i in range(size//2):
+        item = random.randint(0,size-1)
+        p = random.randint(-9999,9999)
+        heap.update(item, p)
+        dic[item] = p
+
+    # deletions, including missing items
+    for i in range(size//4):
+        item = random.randint(0,size+100)
+        heap.delete(item)
+        if item in dic: del dic[item]
+
+    for item in range(size+100):
+        if (item in heap) != (item in dic): return False
+        if item in dic and heap.priority(item) != dic[item]: return False
+
+    out = []
+    while len(heap) > 0:
+        item = heap.extract()
+        out.append(dic[item])
+    expected = sorted(dic.values())
+    if not min_heap: expected.reverse()
+    return out == expected and len(heap._pos) == 0
+
+def heapInsertManyTest(size, min_heap):
+    """
+    Fills heaps through insertMany with small and large batches (covering both the sift-up and rebuild paths),
+    including tuple keys, which cannot be compared with a float sentinel.
+    Returns True if the heaps extract the same keys as sorting, and False otherwise.
+    """
+    heap = Heap(min_heap)
+    ar = []
+    for batch_size in [size, size//10, 1, 0, 3*size]:
+        batch = [random.randint(-9999,9999) for i in range(batch_size)]
+        heap.insertMany(batch)
+        ar.extend(batch)
+        if not heapCompare(heap, ar): return False
+
+    expected = sorted(ar, reverse = not min_heap)
+    if heap.extractAll() != expected: return False
+
+    tuples = [(random.randint(-99,99), i) for i in range(size)]
+    heap = Heap(min_heap)
+    heap.insertMany(tuples[:size//2])
+    for t in tuples[size//2:]:
+        heap.insert(t)
+    return heap.extractAll() == sorted(tuples, reverse = not min_heap)
+
+def heapReplaceTest(size, min_heap):
+    """
+    Applies random pushPop and replace operations to a heap and to a sorted array.
+    Returns True if both return the same keys and end with the same contents, and False otherwise.
+    """
+    heap = Heap(min_heap)
+    ar = [random.randint(-9999,9999) for i in range(size)]
+    heap.createHeap(ar)
+    for i in range(size):
+        k = random.randint(-9999,9999)
+        ar.append(k)
+        if min_heap: top = min(ar)
+        else: top = max(ar)
+        if random.random() < 0.5:
+            result = heap.pushPop(k)
+        else:
+            ar.remove(k)
+            if min_heap: top = min(ar)
+            else: top = max(ar)
+            ar.append(k)
+            result = heap.replace(k)
+        ar.remove(top)
+        if result != top: return False
+    return heapCompare(heap, ar)
+
+def heapIterTest(size, min_heap, heap = None):
+    """
+    Checks iterSorted and iterExtract against sorting, on a Heap (or the given heap) filled with random keys.
+    Returns True if iterSorted yields the sorted keys without changing the heap, and iterExtract removes exactly the keys it yields; False otherwise.
+    """
+    if heap is None: heap = Heap(min_heap)
+    ar = [random.randint(-9999,9999) for i in range(size)]
+    heap.createHeap(ar)
+    ar.sort(reverse = not min_heap)
+    before = list(heap._keys)
+
+    if list(heap.iterSorted()) != ar: return False
+    k = random.randint(0, size)
+    first = []
+    for key in heap.iterSorted():
+        if len(first) == k: break
+        first.append(key)
+    if first != ar[:k] or heap._keys != before: return False
+
+    taken = list(itertools.islice(heap.iterExtract(), k))
+    if taken != ar[:k] or len(heap) != size - k: return False
+    return list(heap.drain()) == ar[k:] and len(heap) == 0
+
+def payloadHeapRandomTest(size, min_heap, typecode = None):
+    """
+    Applies random pushes and pops to a PayloadHeap and to a sorted list of (priority, payload) pairs.
+    Returns True if every pop returns a pair with the expected priority whose payload was pushed with it, and False otherwise.
+    """
+    heap = PayloadHeap(min_heap, typecode)
+    ar = []
+    for i in range(size):
+        if random.random() < 0.6 or len(ar) == 0:
+            p = random.randint(-9999,9999)
+            heap.push(p, (p, i))
+            ar.append(p)
+        else:
+            if min_heap: top = min(ar)
+            else: top = max(ar)
+            ar.remove(top)
+            priority, payload = heap.pop()
+            if priority != top or payload[0] != top: return False
+        if len(heap) != len(ar): return False
+    ar.sort(reverse = not min_heap)
+    for top in ar:
+        priority, payload = heap.pop()
+        if priority != top or payload[0] != top: return False
+    return heap.pop() is None
+
+def topKTest(size, k):
+    """
+    Compares topK and TopK against sorting, for both largest and smallest, with and without a key function.
+    Returns True if all results match, and False otherwise.
+    """
+    ar = [random.randint(-9999,9999) for i in range(size)]
+    if topK(ar, k) != sorted(ar, reverse = True)[:k]: return False
+    if topK(ar, k, largest = False) != sorted(ar)[:k]: return False
+
+    records = [(i, n) for i, n in enumerate(ar)]
+    score = lambda r: r[1]
+    acc = TopK(k, key = score)
+    for r in records:
+        acc.push(r)
+    if len(acc) != min(k, size): return False
+    if [score(r) for r in acc.result()] != sorted(ar, reverse = True)[:k]: return False
+    return True
+
+def daryHeapArityTest():
+    """
+    Checks that DaryHeap rejects fewer than 2 children per node, and that d = 2 sorts like Heap.
+    Returns True if d = 1, 0 and -1 raise ValueError and d = 2 sorts correctly, and False otherwise.
+    """
+    for d in [1, 0, -1]:
+        try:
+            DaryHeap(d, True)
+            return False
+        except ValueError:
+            pass
+    return heapRandomSort(100, True, DaryHeap(2, True))
+
+def heapMergeTest(inputs, size):
+    """
+    Merges a number of random sorted lists with merge(), in both directions and with a key function, and compares with sorting.
+    Also checks that merge() reads its inputs lazily. Returns True if all results match, and False otherwise.
+    """
+    lists = [sorted(random.randint(-999,999) for i in range(random.randint(0,size))) for j in range(inputs)]
+    everything = [n for l in lists for n in l]
+
+    if list(merge(*lists)) != sorted(everything): return False
+    if list(merge(*[l[::-1] for l in lists], reverse = True)) != sorted(everything, reverse = True): return False
+
+    # records ordered by score only; equal scores must keep the order of their inputs
+    records = [[(n, j) for n in l] for j, l in enumerate(lists)]
+    merged = list(merge(*records, key = lambda r: r[0]))
+    if merged != sorted((r for l in records for r in l), key = lambda r: r[0]): return False
+
+    # an endless input must not stop the merge from starting
+    def endless():
+        n = -1000
+        while True:
+            yield n
+            n += 1
+    first = merge(endless(), *lists)
+    if next(first) != -1000: return False
+
+    # a misspelled keyword argument is an error as soon as merge() is called, not silently ignored
+    try:
+        merge(*lists, reversed = True)
+        return False
+    except TypeError:
+        pass
+
+    return True
+
+def pairingHeapRandomTest(size):
+    """
+    Applies random inserts, decreaseKeys, deletes, melds and extractMins to a PairingHeap and to a dictionary of live handles.
+    Returns True if every extracted key is the minimum of the live keys and the heap empties in sorted order, and False otherwise.
+    """
+    heap = PairingHeap()
+    live = {}
+    for i in range(size):
+        op = random.random()
+        if op < 0.4 or len(live) == 0:
+            node = heap.insert(random.randint(-9999,9999), i)
+            live[i] = node
+        elif op < 0.6:
+            node = live[random.choice(list(live))]
+            heap.decreaseKey(node, node.key - random.randint(-10,1000))
+        elif op < 0.7:
+            node = live.pop(random.choice(list(live)))
+            heap.delete(node)
+        elif op < 0.8:
+            other = PairingHeap()
+            for j in range(random.randint(0,10)):
+                node = other.insert(random.randint(-9999,9999), (i, j))
+                live[(i, j)] = node
+            heap.meld(other)
+            if len(other) != 0: return False
+        else:
+            node = heap.extractMin()
+            if node.key != min(n.key for n in live.values()): return False
+            del live[node.value]
+        if len(heap) != len(live): return False
+
+    expected = sorted(n.key for n in live.values())
+    return heap.extractAll() == expected and len(heap) == 0
+
+def minMaxHeapRandomTest(size):
+    """
+    Applies random inserts, extractMins and extractMaxes to a MinMaxHeap and to a sorted list, then checks a fixed-capacity heap.
+    Returns True if both ends match throughout and the bounded heap keeps the best keys; False otherwise.
+    """
+    heap = MinMaxHeap()
+    ar = [random.randint(-9999,9999) for i in range(size//4)]
+    heap.createHeap(ar)
+    for i in range(size):
+        op = random.random()
+        if op < 0.5 or len(ar) == 0:
+            k = random.randint(-9999,9999)
+            heap.insert(k)
+            ar.append(k)
+        elif op < 0.75:
+            ar.remove(min(ar))
+            heap.extractMin()
+        else:
+            ar.remove(max(ar))
+            heap.extractMax()
+        if len(ar) != len(heap): return False
+        if ar and (heap.minimum() != min(ar) or heap.maximum() != max(ar)): return False
+    if not heapCompare(heap, ar): return False
+
+    # fixed capacity: keep the 50 smallest (evicting the maximum), then the 50 largest (evicting the minimum)
+    for evict_max in [True, False]:
+        bounded = MinMaxHeap(capacity = 50, evict_max = evict_max)
+        keys = [random.randint(-9999,9999) for i in range(size)]
+        for k in keys:
+            bounded.insert(k)
+        expected = sorted(keys, reverse = not evict_max)[:50]
+        if sorted(bounded._keys) != sorted(expected): return False
+
+    return True
+
+def radixHeapRandomTest(size):
+    """
+    Runs a monotone event simulation on a RadixHeap and a MinHeap side by side: each extracted time schedules new events at later times.
+    Then checks that peeking with minimum() does not stop keys below the peeked minimum from being inserted.
+    Returns True if both extract the same times, inserting below the last extracted minimum raises ValueError,
+    and peeking does not change the insert floor; False otherwise.
+    """
+    radix = RadixHeap()
+    heap = MinHeap()
+    for i in range(10):
+        k = random.randint(0,1000)
+        radix.insert(k, i)
+        heap.insert(k)
+
+    for i in range(size):
+        if len(heap) == 0: break
+        if radix.minimum() != heap.minimum(): return False
+        now = radix.extractMin()
+        if now != heap.extractMin(): return False
+        for j in range(random.randint(0,2)):
+            k = now + random.choice([0, 1, random.randint(0,100), random.randint(0,10**6)])
+            radix.insert(k)
+            heap.insert(k)
+
+    if len(radix) != len(heap) or radix.extractAll() != heap.extractAll(): return False
+
+    try:
+        radix.insert(now - 1)
+        if now != 0: return False
+    except ValueError:
+        pass
+
+    # peeking does not raise the insert floor: keys below the peeked minimum are still accepted
+    radix = RadixHeap()
+    radix.insert(10)
+    radix.insert(20)
+    if radix.minimum() != 10: return False
+    radix.insert(5)
+    if radix.minimum() != 5 or radix.extractMin() != 5: return False
+    radix.insert(7)
+    if radix.minimum() != 7: return False
+    radix.insert(5)
+    return radix.extractAll() == [5, 7, 10, 20]
+
+def radixHeapBenchmark(size = 10**5):
+    """
+    Times a monotone event simulation (extract the next time, schedule two later events) on MinHeap and on RadixHeap.
+    """
+    print "\nBenchmarking RadixHeap vs. MinHeap: events =", size
+    steps = [(random.randint(1,1000), random.randint(1,10**6)) for i in range(size)]
+    for name, heap in [("MinHeap", MinHeap()), ("RadixHeap", RadixHeap())]:
+        d = datetime.datetime.now()
+        for i in range(1000):
+            heap.insert(i)
+        for a, b in steps:
+            now = heap.extractMin()
+            heap.insert(now + a)
+            heap.insert(now + b)
+            heap.extractMin()
+        print name, datetime.datetime.now() - d
+
+def payloadHeapBenchmark(size = 10**6):
+    """
+    Pushes and then pops size (priority, payload) entries, comparing a MinHeap of KeyValuePairs with a PayloadHeap
+    using a list and a typed 'd' array for the priorities. Prints the timings and the approximate memory per entry.
+    """
+    print "\nBenchmarking PayloadHeap vs. MinHeap of KeyValuePairs: entries =", size
+    priorities = [random.random() for i in range(size)]
+
+    d = datetime.datetime.now()
+    heap = MinHeap()
+    for i, p in enumerate(priorities):
+        heap.insert(KeyValuePair(p, i))
+    memory = sys.getsizeof(heap._keys) + sum(sys.getsizeof(kvp) + sys.getsizeof(kvp.__dict__) + sys.getsizeof(kvp.key) for kvp in heap._keys)
+    while len(heap) > 0:
+        heap.extractMin()
+    print "MinHeap of KeyValuePairs", datetime.datetime.now() - d, ", bytes per entry (excluding payload objects) =", memory // size
+
+    for typecode in [None, 'd']:
+        d = datetime.datetime.now()
+        heap = PayloadHeap(True, typecode)
+        for i, p in enumerate(priorities):
+            heap.push(p, i)
+        memory = sys.getsizeof(heap._priorities) + sys.getsizeof(heap._payloads)
+        if typecode is None: memory += sum(sys.getsizeof(p) for p in heap._priorities)
+        while len(heap) > 0:
+            heap.pop()
+        print "PayloadHeap, typecode =", typecode, datetime.datetime.now() - d, ", bytes per entry (excluding payload objects) =", memory // size
+
+def hashTableBenchmark(size = 10**5):
+    """
+    Times inserts, successful and failed lookups and deletes of size random keys on HashTable (chaining) and OpenHashTable (linear probing).
+    Prints the timings and the approximate memory per entry of each table's structure, excluding the key and value objects.
+    """
+    print "\nBenchmarking HashTable vs. OpenHashTable: keys =", size
+    keys = random.sample(xrange(10**9), size)
+    missing = [k + 10**9 for k in keys]
+    for name, ht in [("HashTable", HashTable()), ("OpenHashTable", OpenHashTable())]:
+        d = datetime.datetime.now()
+        for k in keys:
+            ht.insert(k, k)
+        time_insert = datetime.datetime.now() - d
+
+        if isinstance(ht, OpenHashTable):
+            memory = sys.getsizeof(ht._keys) + sys.getsizeof(ht._vals) + sys.getsizeof(ht._hashes)
+        else:
+            memory = sys.getsizeof(ht._v)
+            for l in ht._v:
+                while l:
+                    memory += sys.getsizeof(l) + sys.getsizeof(l.__dict__) + sys.getsizeof(l.value) + sys.getsizeof(l.value.__dict__)
+                    l = l.next
+
+        d = datetime.datetime.now()
+        for k in keys:
+            ht.lookup(k)
+        time_hit = datetime.datetime.now() - d
+        d = datetime.datetime.now()
+        for k in missing:
+            ht.lookup(k)
+        time_miss = datetime.datetime.now() - d
+
+        d = datetime.datetime.now()
+        for k in keys:
+            ht.delete(k)
+        time_delete = datetime.datetime.now() - d
+        print name, ": insert", time_insert, ", lookup", time_hit, ", failed lookup", time_miss, ", delete", time_delete, ", bytes per entry =", memory // size
+
+def hashTableBulkBenchmark(size = 10**6):
+    """
+    Loads size random pairs into a HashTable and an OpenHashTable one insert at a time, and with fromItems given the expected size. Prints the timings.
+    """
+    print "\nBenchmarking bulk loading, insert vs. fromItems: pairs =", size
+    pairs = [(k, k) for k in random.sample(xrange(10**9), size)]
+    for cls in [HashTable, OpenHashTable]:
+        d = datetime.datetime.now()
+        ht = cls()
+        for k, v in pairs:
+            ht.insert(k, v)
+        time_insert = datetime.datetime.now() - d
+
+        d = datetime.datetime.now()
+        ht = cls.fromItems(pairs, expected_size = size)
+        print cls.__name__, ": insert", time_insert, ", fromItems", datetime.datetime.now() - d
+
+def hashTableLatencyBenchmark(size = 10**6):
+    """
+    Inserts size random keys into HashTable and IncrementalHashTable, timing every insert. Prints the total time and the slowest single insert,
+    which for HashTable is the last full rebuild.
+    """
+    print "\nBenchmarking insert latency, HashTable vs. IncrementalHashTable: keys =", size
+    keys = random.sample(xrange(10**9), size)
+    for name, ht in [("HashTable", HashTable()), ("IncrementalHashTable", IncrementalHashTable())]:
+        worst = datetime.timedelta(0)
+        start = datetime.datetime.now()
+        for k in keys:
+            d = datetime.datetime.now()
+            ht.insert(k, k)
+            worst = max(worst, datetime.datetime.now() - d)
+        print name, ": total", datetime.datetime.now() - start, ", slowest insert", worst
+
+def dijkstraBenchmark(vertices = 20000, degree = 10):
+    """
+    Runs Dijkstra's shortest paths on a random directed graph, once with a MinHeap holding stale duplicate entries
+    (MinHeap.decreaseKey needs an index that callers cannot know), and once with PairingHeap.decreaseKey on handles.
+    Checks that both give the same distances and prints the timings.
+    """
+    print "\nBenchmarking Dijkstra: MinHeap vs. PairingHeap, vertices =", vertices, "edges =", vertices * degree
+    graph = [[(random.randint(0,vertices-1), random.randint(1,1000)) for j in range(degree)] for i in range(vertices)]
+
+    d = datetime.datetime.now()
+    dist = [None] * vertices
+    heap = MinHeap(key = lambda e: e[0])
+    heap.insert((0, 0))
+    while len(heap) > 0:
+        du, u = heap.extractMin()
+        if dist[u] is not None: continue
+        dist[u] = du
+        for v, w in graph[u]:
+            if dist[v] is None:
+                heap.insert((du + w, v))
+    time_heap = datetime.datetime.now() - d
+
+    d = datetime.datetime.now()
+    dist2 = [None] * vertices
+    handles = [None] * vertices
+    heap = PairingHeap()
+    handles[0] = heap.insert(0, 0)
+    while len(heap) > 0:
+        node = heap.extractMin()
+        u = node.value
+        dist2[u] = node.key
+        for v, w in graph[u]:
+            if dist2[v] is not None: continue
+            if handles[v] is None:
+                handles[v] = heap.insert(node.key + w, v)
+            else:
+                heap.decreaseKey(handles[v], node.key + w)
+    time_pairing = datetime.datetime.now() - d
+
+    print "Same distances:", dist == dist2
+    print "MinHeap", time_heap, "PairingHeap", time_pairing
+
+def daryHeapBenchmark(size = 10**5):
+    """
+    Times DaryHeap with d = 2, 4 and 8 on an insert-heavy mix (size inserts, size/10 extracts) and an extract-heavy mix
+    (createHeap from size keys, then extract them all). Prints the timings.
     """
-    Creates a SortedArray object and an normal Python list with random elements of a given size.
+    print "\nBenchmarking DaryHeap: n =", size
+    keys = [random.randint(-10**9,10**9) for i in range(size)]
+    for d in [2, 4, 8]:
+        heap = DaryHeap(d, True)
+        t = datetime.datetime.now()
+        for k in keys:
+            heap.insert(k)
+        for i in range(size//10):
+            heap.extract()
+        time_insert = datetime.datetime.now() - t
+
+        heap = DaryHeap(d, True)
+        t = datetime.datetime.now()
+        heap.createHeap(keys)
+        heap.extractAll()
+        time_extract = datetime.datetime.now() - t
+
+        print "d =", d, "insert-heavy", time_insert, "extract-heavy", time_extract
+
+def concurrentQueueTest(producers, consumers, size):
+    """
+    Runs producer threads putting random keys (singly and in batches) and consumer threads taking them (singly and in batches)
+    through a ConcurrentPriorityQueue. Returns True if every key is consumed exactly once, and False otherwise.
+    """
+    queue = ConcurrentPriorityQueue()
+    produced = [[random.randint(-9999,9999) for i in range(size)] for p in range(producers)]
+    consumed = []
+    lock = threading.Lock()
+
+    def produce(keys):
+        for i in range(0, len(keys), 10):
+            if i % 20 == 0:
+                queue.putMany(keys[i:i+10])
+            else:
+                for k in keys[i:i+10]:
+                    queue.put(k)
+
+    def consume(batch):
+        while True:
+            if batch: items = queue.getMany(5, timeout = 0.2)
+            else:
+                try: items = [queue.get(timeout = 0.2)]
+                except Empty: items = []
+            if not items: return
+            with lock:
+                consumed.extend(items)
+
+    threads = [threading.Thread(target = produce, args = (keys,)) for keys in produced]
+    threads += [threading.Thread(target = consume, args = (c % 2 == 0,)) for c in range(consumers)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    return sorted(consumed) == sorted(k for keys in produced for k in keys) and len(queue) == 0
+
+def concurrentQueueEmptyTest():
+    """
+    Checks that get with a timeout and getNowait raise Empty on an empty ConcurrentPriorityQueue, and that get waits for the timeout first.
+    Returns True if both raise and the queue still works afterwards, and False otherwise.
+    """
+    queue = ConcurrentPriorityQueue()
+    t = datetime.datetime.now()
+    try:
+        queue.get(timeout = 0.05)
+        return False
+    except Empty:
+        if (datetime.datetime.now() - t).total_seconds() < 0.04: return False
+    try:
+        queue.getNowait()
+        return False
+    except Empty:
+        pass
+    queue.putMany([3, 1, 2])
+    return queue.getNowait() == 1 and queue.get(timeout = 0.05) == 2 and queue.getMany(5, timeout = 0.05) == [3] and queue.getMany(5, timeout = 0.01) == []
+
+def asyncQueueTest():
+    """
+    Checks that AsyncPriorityQueue serves waiting get / getMany futures in order once items are put, and items already queued immediately.
+    Returns True if all results match, and False otherwise. Returns None if asyncio is not available.
+    """
+    if priority_queue.asyncio is None: return None
+    asyncio = priority_queue.asyncio
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        queue = AsyncPriorityQueue()
+        first = queue.get()
+        batch = queue.getMany(3)
+        if first.done() or batch.done(): return False
+
+        loop.call_soon(queue.putMany, [5, 1, 3, 2, 4])
+        results = loop.run_until_complete(asyncio.gather(first, batch))
+        if results != [1, [2, 3, 4]]: return False
+
+        ready = queue.get()
+        if not ready.done() or ready.result() != 5: return False
+
+        cancelled = queue.get()
+        cancelled.cancel()
+        waiting = queue.get()
+        loop.call_later(0.01, queue.put, 7)
+        return loop.run_until_complete(waiting) == 7 and len(queue) == 0
+    finally:
+        loop.close()
+
+def deadlineSchedulerTest(size):
+    """
+    Schedules random deadlines on a DeadlineScheduler, cancels most of them, and pops them as time advances, checking against a dictionary.
+    Returns True if exactly the live timers fire, in deadline order, and the heap stays bounded by compaction; False otherwise.
+    """
+    scheduler = DeadlineScheduler()
+    live = {}
+    now = 0
+    for i in range(size):
+        timer = scheduler.schedule(now + random.randint(1,1000), i)
+        live[i] = timer
+        if random.random() < 0.8:
+            victim = random.choice(list(live))
+            if not scheduler.cancel(live.pop(victim)): return False
+        if len(scheduler._heap) > 2 * len(scheduler) + 1: return False
+
+        if i % 50 == 0:
+            now += 100
+            due = scheduler.popDue(now)
+            expected = sorted((t.deadline, t._seq, p) for p, t in live.items() if t.deadline <= now)
+            if due != [p for d, s, p in expected]: return False
+            for p in due:
+                if not live.pop(p).fired: return False
+
+    if len(scheduler) != len(live): return False
+    if live and scheduler.nextDeadline() != min(t.deadline for t in live.values()): return False
+    return sorted(scheduler.popDue(now + 10**6)) == sorted(live) and len(scheduler) == 0
+
+def sortedArrayRandomTest(size, s_arr = None):
+    """
+    Creates a SortedArray object (unless an empty one is passed) and an normal Python list with random elements of a given size.
     Compares the contents of the two objects after insertions and deletions.
     Returns False if any test shows not equal; otherwise returns True.
-    Uses for testing the SortedArray class.
+    Uses for testing the SortedArray class and subclasses.
     """
-    s_arr = SortedArray()
+    if s_arr is None: s_arr = SortedArray()
     ar = []
 
     # insertions
@@ -235,7 +932,131 @@ def sortedArrayCompare(s_arr, ar):
     if len(s_arr) != len(ar): return False
     for i in range(len(ar)):
         if ar[i] != s_arr[i]: return False
+    if list(s_arr) != ar: return False
+    if len(ar) > 0 and (s_arr.minimum() != ar[0] or s_arr.maximum() != ar[-1]): return False
+    for i in range(0,len(ar),7):
+        j = s_arr.index(ar[i])
+        if j is None or ar[j] != ar[i]: return False
     return True 
+
+def sortedArrayRangeTest(size, s_arr = None):
+    """
+    Fills a SortedArray (new, unless an empty one is passed) with random values, including duplicates.
+    Compares bisectLeft / bisectRight, irange and countRange against the bisect module and list comprehensions on a normal Python list.
+    Returns False if any test shows not equal; otherwise returns True.
+    """
+    if s_arr is None: s_arr = SortedArray()
+    ar = [random.randint(-100,100) for i in range(size)]
+    s_arr.insertMany(ar)
+    ar.sort()
+
+    for i in range(50):
+        lo, hi = random.randint(-110,110), random.randint(-110,110)
+        if s_arr.bisectLeft(lo) != bisect.bisect_left(ar, lo): return False
+        if s_arr.bisectRight(lo) != bisect.bisect_right(ar, lo): return False
+
+        inclusive = (random.random() < 0.5, random.random() < 0.5)
+        expected = [n for n in ar if (lo < n or (inclusive[0] and lo == n)) and (n < hi or (inclusive[1] and n == hi))]
+        if list(s_arr.irange(lo, hi, inclusive)) != expected: return False
+        if list(s_arr.irange(lo, hi, inclusive, reverse = True)) != expected[::-1]: return False
+        if s_arr.countRange(lo, hi, inclusive) != len(expected): return False
+
+    if list(s_arr.irange()) != ar: return False
+    if list(s_arr.irange(hi = 0)) != [n for n in ar if n <= 0]: return False
+    if list(s_arr.irange(lo = 0, reverse = True)) != [n for n in ar if n >= 0][::-1]: return False
+
+    return True
+
+def sortedArrayLookupTest(size, s_arr = None):
+    """
+    Fills a SortedArray (new, unless an empty one is passed) with random values and compares lookupSorted against bisectLeft,
+    for sorted queries, unsorted queries and sorted queries with repeats.
+    Returns False if any test shows not equal; otherwise returns True.
+    """
+    if s_arr is None: s_arr = SortedArray()
+    s_arr.insertMany([random.randint(-1000,1000) for i in range(size)])
+
+    for queries in [sorted(random.randint(-1100,1100) for i in range(size)),
+                    [random.randint(-1100,1100) for i in range(size)],
+                    sorted(random.randint(-1100,1100) for i in range(size//10)) * 3]:
+        result = s_arr.lookupSorted(queries)
+        if len(result) != len(queries): return False
+        for j, q in enumerate(queries):
+            i = s_arr.bisectLeft(q)
+            if i < len(s_arr) and s_arr[i] == q:
+                if result[j] != i: return False
+            elif result[j] != -1: return False
+
+    return True
+
+def sortedArrayLookupBenchmark(size = 10**6, queries = 10**4):
+    """
+    Compares looping over index() with one lookupSorted() call, for a sorted batch of queries.
+    """
+    print "\nBenchmarking SortedArray.lookupSorted: n =", size, "queries =", queries
+    s_arr = SortedArray([random.randint(-10**9,10**9) for i in range(size)])
+    probes = sorted(s_arr[random.randint(0,size-1)] for i in range(queries))
+
+    d = datetime.datetime.now()
+    for q in probes:
+        s_arr.index(q)
+    print "Looped index():", datetime.datetime.now() - d
+
+    d = datetime.datetime.now()
+    s_arr.lookupSorted(probes)
+    print "lookupSorted():", datetime.datetime.now() - d
+
+def blockedSortedArrayOffsetsTest(size):
+    """
+    Interleaves random inserts and deletes on a BlockedSortedArray with small chunks with positional reads, checking against a sorted list,
+    and checks that appending past the maximum only leaves the offsets of the last chunks to refresh.
+    Returns True if every read matches, and False otherwise.
+    """
+    s_arr = BlockedSortedArray()
+    s_arr.load = 8
+    values = []
+    for i in range(size):
+        v = random.randint(-999,999)
+        if values and random.random() < 0.4:
+            v = random.choice(values)
+            s_arr.delete(v)
+            values.remove(v)
+        else:
+            s_arr.insert(v)
+            bisect.insort(values, v)
+        if len(s_arr) != len(values): return False
+        if values:
+            k = random.randint(0, len(values)-1)
+            if s_arr[k] != values[k] or s_arr.bisectLeft(values[k]) != bisect.bisect_left(values, values[k]): return False
+
+    if values and s_arr[0] != values[0]: return False
+    s_arr.insert(1000)
+    values.append(1000)
+    if s_arr._stale < len(s_arr._v) - 2: return False
+    return list(s_arr) == values and s_arr[len(values) - 1] == 1000 and s_arr.index(1000) == len(values) - 1
+
+def blockedSortedArrayTest():
+    """
+    Runs the SortedArray random and batch tests against BlockedSortedArray, with a small chunk size so chunks split and merge often.
+    """
+    print "\nTesting BlockedSortedArray: random operations"
+    for i in range(20):
+        s_arr = BlockedSortedArray()
+        s_arr.load = 8
+        if sortedArrayRandomTest(500, s_arr): print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
+
+    print "\nTesting BlockedSortedArray: batch operations"
+    for i in range(20):
+        s_arr = BlockedSortedArray()
+        s_arr.load = 8
+        if sortedArrayBatchTest(500, s_arr): print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
+
+    print "\nTesting BlockedSortedArray: positional reads between writes"
+    for i in range(20):
+        if blockedSortedArrayOffsetsTest(500): print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
     
 def sortedArrayFullTest():
     """
@@ -275,6 +1096,331 @@ def sortedArrayFullTest():
         if sortedArrayRandomTest(500): print "Test",i+1,"successful"
         else: print "Failure at test",i+1
 
+    print "\nTesting SortedArray: batch operations"
+    for i in range(20):
+        if sortedArrayBatchTest(500): print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
+
+    print "\nTesting SortedArray: range queries"
+    for i in range(20):
+        passed = sortedArrayRangeTest(500) and sortedArrayRangeTest(500, NumericSortedArray(typecode = 'l'))
+        s_arr = BlockedSortedArray()
+        s_arr.load = 8
+        passed = passed and sortedArrayRangeTest(500, s_arr)
+        if passed: print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
+
+    print "\nTesting SortedArray: sorted batch lookups"
+    for i in range(20):
+        passed = sortedArrayLookupTest(500) and sortedArrayLookupTest(500, NumericSortedArray(typecode = 'l'))
+        s_arr = BlockedSortedArray()
+        s_arr.load = 8
+        passed = passed and sortedArrayLookupTest(500, s_arr)
+        if passed: print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
+
+    blockedSortedArrayTest()
+    numericSortedArrayTest()
+
+    bufferedSortedArrayTest()
+
+    print "\nTesting MappedSortedArray: save and openMmap"
+    for i in range(20):
+        if mappedSortedArrayTest(random.randint(0,500)): print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
+
+def sortedArrayBatchTest(size, s_arr = None):
+    """
+    Compares a SortedArray (new, unless an empty one is passed) filled through insertMany / deleteMany with a normal Python list.
+    Returns False if any test shows not equal; otherwise returns True.
+    Used for testing the SortedArray batch methods.
+    """
+    if s_arr is None: s_arr = SortedArray()
+    ar = []
+
+    # batch insertions, in several rounds so existing values are merged with new ones
+    for r in range(4):
+        batch = [random.randint(-10000,10000) for i in range(size//4)]
+        ar.extend(batch)
+        s_arr.insertMany(batch)
+    ar.sort()
+    if not sortedArrayCompare(s_arr,ar): return False
+
+    # batch deletions, mixing known and random values
+    batch = [ar[random.randint(0,len(ar)-1)] for i in range(size//4)]
+    batch += [random.randint(-10000,10000) for i in range(size//4)]
+    for n in batch:
+        if n in ar:
+            ar.remove(n)
+    s_arr.deleteMany(batch)
+    if not sortedArrayCompare(s_arr,ar): return False
+
+    return True
+
+def sortedArrayBenchmark(sizes = [10**3, 10**4, 10**5, 10**6], batch = 100):
+    """
+    Times inserting and deleting a batch of random values one by one versus through insertMany / deleteMany, on SortedArrays of the given sizes.
+    Prints the timings for each size. The per-element path is O(n) per value, so the larger sizes take a while.
+    """
+    print "\nBenchmarking SortedArray: per-element vs. batch, batch size =", batch
+    for size in sizes:
+        values = [random.randint(-10**9,10**9) for i in range(size)]
+        new = [random.randint(-10**9,10**9) for i in range(batch)]
+
+        s_arr = SortedArray(values)
+        d = datetime.datetime.now()
+        for n in new:
+            s_arr.insert(n)
+        for n in new:
+            s_arr.delete(n)
+        time_single = datetime.datetime.now() - d
+
+        s_arr = SortedArray(values)
+        d = datetime.datetime.now()
+        s_arr.insertMany(new)
+        s_arr.deleteMany(new)
+        time_batch = datetime.datetime.now() - d
+
+        print "n =", size, "per-element", time_single, "batch", time_batch
+
+def numericSortedArrayTest():
+    """
+    Runs the SortedArray random and batch tests against NumericSortedArray, and checks indexMany / searchSorted against index().
+    """
+    print "\nTesting NumericSortedArray: random operations"
+    for i in range(20):
+        if sortedArrayRandomTest(500, NumericSortedArray(typecode = 'l')): print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
+
+    print "\nTesting NumericSortedArray: batch operations"
+    for i in range(20):
+        if sortedArrayBatchTest(500, NumericSortedArray(typecode = 'l')): print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
+
+    print "\nTesting NumericSortedArray: batch lookups"
+    for i in range(20):
+        s_arr = NumericSortedArray([random.randint(-1000,1000) for j in range(500)])
+        queries = [random.randint(-1100,1100) for j in range(500)]
+        indexes = s_arr.indexMany(queries)
+        points = s_arr.searchSorted(queries)
+        passed = True
+        for j, q in enumerate(queries):
+            if indexes[j] == -1:
+                if s_arr.index(q) is not None: passed = False
+            elif s_arr[indexes[j]] != q: passed = False
+            if (points[j] > 0 and s_arr[points[j]-1] >= q) or (points[j] < len(s_arr) and s_arr[points[j]] < q): passed = False
+        if passed: print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
+
+    print "\nTesting NumericSortedArray: lookups from iterators and of fractional values"
+    s_arr = NumericSortedArray(iter([5, 1, 3, 2]), 'l')
+    passed = list(s_arr) == [1, 2, 3, 5]
+    passed = passed and list(s_arr.indexMany(q for q in [0, 4, 6])) == [-1, -1, -1]
+    passed = passed and list(s_arr.indexMany(q for q in [1, 5, 2.5])) == [0, 3, -1]
+    passed = passed and list(s_arr.searchSorted(q for q in [0, 4, 6])) == [0, 3, 4]
+    passed = passed and list(NumericSortedArray([-1, 3], 'l').indexMany([-1.5, -1, 3.0])) == [-1, 0, 1]
+    if passed: print "Test successful"
+    else: print "Test failed"
+
+def numericSortedArrayBenchmark(size = 10**6, queries = 10**4):
+    """
+    Compares the memory per value of SortedArray and NumericSortedArray, and the time of looping over index() versus one indexMany() call.
+    """
+    print "\nBenchmarking NumericSortedArray: n =", size, "queries =", queries
+    values = [random.random() for i in range(size)]
+    probes = [values[random.randint(0,size-1)] for i in range(queries)]
+
+    s_arr = SortedArray(values)
+    n_arr = NumericSortedArray(values)
+    list_bytes = sys.getsizeof(s_arr._v) + sum(sys.getsizeof(n) for n in s_arr._v)
+    print "Bytes per value: SortedArray", list_bytes // size, "NumericSortedArray", sys.getsizeof(n_arr._v) // size
+
+    d = datetime.datetime.now()
+    for q in probes:
+        s_arr.index(q)
+    print "Looped index():", datetime.datetime.now() - d
+
+    d = datetime.datetime.now()
+    n_arr.indexMany(probes)
+    print "indexMany():", datetime.datetime.now() - d
+
+def mappedSortedArrayTest(size):
+    """
+    Saves a NumericSortedArray with random values to a temporary file and opens it again with SortedArray.openMmap.
+    Compares the lookups of the mapped array with the original, and checks that modifications are refused.
+    Returns False if any test shows not equal; otherwise returns True.
+    """
+    s_arr = NumericSortedArray([random.randint(-1000,1000) for i in range(size)], typecode = 'l')
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        s_arr.save(path)
+        m_arr = SortedArray.openMmap(path)
+
+        passed = sortedArrayCompare(m_arr, list(s_arr))
+        passed = passed and m_arr.minimum() == s_arr.minimum() and m_arr.maximum() == s_arr.maximum()
+        passed = passed and list(m_arr.irange(-100, 100)) == list(s_arr.irange(-100, 100))
+        queries = sorted(random.randint(-1100,1100) for i in range(size))
+        passed = passed and list(m_arr.lookupSorted(queries)) == list(s_arr.lookupSorted(queries))
+        passed = passed and list(m_arr.indexMany(queries)) == list(s_arr.indexMany(queries))
+
+        try:
+            m_arr.insert(0)
+            passed = False
+        except TypeError:
+            pass
+
+        m_arr.close()
+    finally:
+        os.remove(path)
+
+    return passed
+
+def bufferedSortedArrayTest():
+    """
+    Runs the SortedArray random, batch and range tests against BufferedSortedArray with a small buffer, and checks that
+    interleaved inserts and deletes are only merged when the buffer fills up.
+    """
+    print "\nTesting BufferedSortedArray: random operations"
+    for i in range(20):
+        passed = sortedArrayRandomTest(500, BufferedSortedArray(buffer_size = 16))
+        passed = passed and sortedArrayBatchTest(500, BufferedSortedArray(buffer_size = 16))
+        passed = passed and sortedArrayRangeTest(500, BufferedSortedArray(buffer_size = 16))
+        if passed: print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
+
+    print "\nTesting BufferedSortedArray: write buffering"
+    for i in range(20):
+        s_arr = BufferedSortedArray(buffer_size = 50)
+        ar = []
+        for j in range(1000):
+            n = random.randint(-100,100)
+            if random.random() < 0.3:
+                s_arr.delete(n)
+                if n in ar: ar.remove(n)
+            else:
+                s_arr.insert(n)
+                ar.append(n)
+        merges = s_arr.mergeCount()
+        passed = len(s_arr) == len(ar) and 0 < merges <= 1000 // 50
+        ar.sort()
+        passed = passed and sortedArrayCompare(s_arr, ar) and s_arr.pending() == 0
+        if passed: print "Test",i+1,"successful, merges =",merges
+        else: print "Failure at test",i+1
+
+def sortedArrayKeyTest(size):
+    """
+    Fills a SortedArray with a key function with random (id, score) records, ordered by score, using insert, insertMany, delete,
+    deleteMany and overwrites. Compares the records and their order with a normal Python list after each step.
+    Returns False if any test shows not equal; otherwise returns True.
+    """
+    score = lambda r: r[1]
+    ar = [(i, random.randint(-100,100)) for i in range(size)]
+    s_arr = SortedArray(ar[:size//2], key = score)
+    for r in ar[size//2:3*size//4]:
+        s_arr.insert(r)
+    s_arr.insertMany(ar[3*size//4:])
+    if not sortedArrayKeyCompare(s_arr, ar, score): return False
+
+    for i in range(size//8):
+        r = ar.pop(random.randint(0,len(ar)-1))
+        s_arr.delete(r)
+    s_arr.delete((-1, 0))
+    batch = [ar[random.randint(0,len(ar)-1)] for i in range(size//4)]
+    for r in batch:
+        if r in ar: ar.remove(r)
+    s_arr.deleteMany(batch)
+    if not sortedArrayKeyCompare(s_arr, ar, score): return False
+
+    for i in range(size//8):
+        r = (size + i, random.randint(-100,100))
+        index = random.randint(0,len(ar)-1)
+        ar.remove(s_arr[index])
+        ar.append(r)
+        s_arr[index] = r
+    if not sortedArrayKeyCompare(s_arr, ar, score): return False
+
+    # bounds and queries are keys
+    if s_arr.countRange(-10, 10) != len([r for r in ar if -10 <= r[1] <= 10]): return False
+    if [r[1] for r in s_arr.irange(hi = 0)] != sorted(r[1] for r in ar if r[1] <= 0): return False
+
+    return True
+
+def sortedArrayKeyCompare(s_arr, ar, key):
+    """
+    Compares a SortedArray with a key function with an unsorted list of the same records.
+    Returns False if the records differ, if they are out of key order, or if index() cannot find one of them.
+    """
+    if sorted(s_arr) != sorted(ar): return False
+    if [key(r) for r in s_arr] != sorted(key(r) for r in ar): return False
+    for r in ar:
+        i = s_arr.index(r)
+        if i is None or s_arr[i] != r: return False
+    return True
+
+def heapKeyTest(size, min_heap):
+    """
+    Fills a Heap with a key function with random (id, score) records, then deletes and extracts them.
+    Returns True if the records come out in score order, and False otherwise.
+    """
+    score = lambda r: r[1]
+    ar = [(i, random.randint(-1000,1000)) for i in range(size)]
+    heap = Heap(min_heap, key = score)
+    heap.createHeap(ar[:size//2])
+    for r in ar[size//2:]:
+        heap.insert(r)
+
+    for i in range(size//4):
+        r = ar.pop(random.randint(0,len(ar)-1))
+        heap.delete(r)
+
+    if heap.isMinHeap() and heap.minimum() not in [r for r in ar if r[1] == min(score(q) for q in ar)]: return False
+    if heap.isMaxHeap() and heap.maximum() not in [r for r in ar if r[1] == max(score(q) for q in ar)]: return False
+
+    out = heap.extractAll()
+    if sorted(out) != sorted(ar): return False
+    expected = sorted(score(r) for r in ar)
+    if heap.isMaxHeap(): expected.reverse()
+    return [score(r) for r in out] == expected
+
+def BSTKeyTest(tree, size):
+    """
+    Fills a BST or AVL tree with a key function with random (id, score) records, ordered by score, and deletes some of them.
+    Returns True if the in-order walk gives the records in score order, one per distinct score, and False otherwise.
+    """
+    score = lambda r: r[1]
+    by_score = {}
+    for i in range(size):
+        r = (i, random.randint(-1000,1000))
+        if r[1] not in by_score: by_score[r[1]] = r
+        tree.insert(Node(value = r))
+
+    for s in random.sample(sorted(by_score), len(by_score)//4):
+        tree.delete(tree.search(s))
+        del by_score[s]
+
+    return tree.inorderWalk() == [by_score[s] for s in sorted(by_score)]
+
+def keyFunctionTest():
+    """
+    Tests the key function support of SortedArray, Heap, BST and AVL.
+    """
+    print "\nTesting key functions: SortedArray"
+    for i in range(20):
+        if sortedArrayKeyTest(400): print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
+
+    print "\nTesting key functions: MinHeap and MaxHeap"
+    for i in range(20):
+        if heapKeyTest(400, True) and heapKeyTest(400, False): print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
+
+    print "\nTesting key functions: BST and AVL"
+    for i in range(20):
+        score = lambda r: r[1]
+        if BSTKeyTest(BST(key = score), 400) and BSTKeyTest(AVL(key = score), 400): print "Test",i+1,"successful"
+        else: print "Failure at test",i+1
+
 def hashFunctionTest():
     """
     Creates a hash function with a given m and hashes a set number of random integers, printing the number of times each slot is hashed to.
@@ -289,6 +1435,33 @@ def hashFunctionTest():
         count[h.h(random.randint(-10000,10000))] += 1
     print count
 
+def hashFunctionPrimeTest(size):
+    """
+    Compares HashFunction._isPrime with trial division for random integers, and checks it on a large pseudoprime and a large prime.
+    Checks _findPrime for random universe sizes, and that hMany agrees with h. Returns True if all match, and False otherwise.
+    """
+    def isPrime(n):
+        if n < 2: return False
+        for i in range(2, int(n**0.5)+1):
+            if n % i == 0: return False
+        return True
+
+    for i in range(size):
+        n = random.randint(0, 10**6)
+        if HashFunction._isPrime(n) != isPrime(n): return False
+
+    # the smallest strong pseudoprime to all prime bases up to 37 (399165290221 * 798330580441), and the Mersenne prime 2**89-1
+    if HashFunction._isPrime(318665857834031151167461): return False
+    if not HashFunction._isPrime(2**89-1): return False
+
+    d = random.randint(2, 10**9)
+    p = HashFunction._findPrime(d)
+    if p <= d or not isPrime(p) or any(isPrime(q) for q in range(d+1, p)): return False
+
+    h = HashFunction(random.randint(1, 1000), d)
+    keys = [random.randint(-10**9, 10**9) for i in range(size)]
+    return h.hMany(keys) == [h.h(k) for k in keys] and h._p == p
+
 def hashTableTest():
     """
     Testing functions for HashTable. Outputs the result of various tests using print.
@@ -343,14 +1516,14 @@ def hashTableTest():
     if not error:
         print "*** All lookups successful after inserts and deletes ***"
 
-def hashTableRandomTest(size):
+def hashTableRandomTest(size, ht = None):
     """
-    Creates a HashTable and dictionary with random elements of a given size.
+    Creates a HashTable (or uses the given empty table) and dictionary with random elements of a given size.
     Compares all elements of the HT and dic after insertions, deletions and failed / random deletions.
     Returns True if the two all the same at all times, and False otherwise.
     Used for testing this implementation of HashTable with the built-in versoin.
     """
-    ht = HashTable()
+    if ht is None: ht = HashTable()
     dic = {}
     time_ht = datetime.timedelta(0)
     time_dic = datetime.timedelta(0)
@@ -404,6 +1577,230 @@ def hashTableRandomTest(size):
     
     return correct
 
+def hashTableChurnTest(size, ht):
+    """
+    Applies random interleaved inserts, overwrites, deletes and lookups, over a small key range, to a hash table and to a dictionary.
+    Returns True if every lookup and the final contents match, and False otherwise. Exercises tombstone reuse and rebuilds.
+    """
+    dic = {}
+    for i in range(size):
+        k = random.randint(0, size//4)
+        op = random.random()
+        if op < 0.4:
+            v = random.randint(-99999,99999)
+            ht[k] = v
+            dic[k] = v
+        elif op < 0.8:
+            del ht[k]
+            dic.pop(k, None)
+        elif ht[k] != dic.get(k) or (k in ht) != (k in dic):
+            return False
+    return hashTableCompare(ht, dic) and sorted(ht.keys()) == sorted(dic.keys())
+
+def hashTableSizeChurnTest(size, ht, ops=None):
+    """
+    Fills a hash table with size keys, then alternately deletes a random key and inserts a new one, so the count stays constant.
+    Returns True if the contents still match and the table resized at most once (a grow) without shrinking back, and False otherwise.
+    """
+    keys = random.sample(xrange(10**9), size)
+    for k in keys:
+        ht[k] = k
+    nxt = 10**9
+    sizes = [ht._m]
+    for i in range((ops or 6*size)//2):
+        del ht[keys.pop(random.randrange(len(keys)))]
+        ht[nxt] = nxt
+        keys.append(nxt)
+        nxt += 1
+        if ht._m != sizes[-1]: sizes.append(ht._m)
+    dic = dict((k, k) for k in keys)
+    return len(sizes) <= 2 and sizes == sorted(sizes) and ht._n == size and hashTableCompare(ht, dic)
+
+def hashTableResizeTest(size):
+    """
+    Fills an IncrementalHashTable and then empties it, checking every key after each operation, including while resizes are in progress.
+    Returns True if all lookups match a dictionary and at least one resize was observed in progress, and False otherwise.
+    """
+    ht = IncrementalHashTable()
+    dic = {}
+    resizing = False
+    keys = random.sample(xrange(10**6), size)
+    for k in keys:
+        ht[k] = -k
+        dic[k] = -k
+        resizing = resizing or ht.resizing()
+        if ht[k] != -k or ht[keys[random.randint(0, len(dic)-1)]] is None: return False
+    for k in keys:
+        del ht[k]
+        del dic[k]
+        resizing = resizing or ht.resizing()
+        if k in ht or (dic and ht[next(iter(dic))] is None): return False
+    return resizing and ht._n == 0 and hashTableCompare(ht, dic)
+
+def hashTableMigrationTest(size):
+    """
+    Reserves room in an IncrementalHashTable, inserts a few keys, calls shrinkToFit, and then fills and empties the table,
+    counting the old buckets each insert or delete migrates.
+    Returns True if no operation moves more than migrate_buckets + 1 buckets and no migration is left to finish when a resize starts, and False otherwise.
+    """
+    ht = IncrementalHashTable()
+    ht.reserve(64 * size)
+    keys = random.sample(xrange(10**6), size)
+    for k in keys[:20]:
+        ht[k] = k
+    ht.shrinkToFit()
+    if ht.resizing() or ht._m != ht._sizeFor(20): return False
+
+    moved = [0]
+    migrateBucket = ht._migrateBucket
+    def countingMigrateBucket(i):
+        moved[0] += 1
+        migrateBucket(i)
+    ht._migrateBucket = countingMigrateBucket
+    unfinished = [0]
+    finishMigration = ht._finishMigration
+    def countingFinishMigration():
+        unfinished[0] += 1
+        finishMigration()
+    ht._finishMigration = countingFinishMigration
+
+    worst = 0
+    for k in keys[20:]:
+        moved[0] = 0
+        ht[k] = k
+        worst = max(worst, moved[0])
+    random.shuffle(keys)
+    for k in keys:
+        moved[0] = 0
+        del ht[k]
+        worst = max(worst, moved[0])
+    return worst <= ht.migrate_buckets + 1 and unfinished[0] == 0 and ht._n == 0
+
+class CountingKey(object):
+    """
+    Hashable key that counts the calls to its __hash__ and __eq__, for checking that hash tables cache hashes.
+    """
+    hashes = 0
+    compares = 0
+
+    def __init__(self, n):
+        self.n = n
+
+    def __hash__(self):
+        CountingKey.hashes += 1
+        return self.n
+
+    def __eq__(self, other):
+        CountingKey.compares += 1
+        return isinstance(other, CountingKey) and self.n == other.n
+
+    def __ne__(self, other):
+        return not self == other
+
+def hashTableGenericKeyTest(size, ht):
+    """
+    Fills an empty hash table with string, tuple and float keys, checking them against a dictionary, including keys that are equal across types (1 and 1.0).
+    Then checks with CountingKeys that every key is hashed once per operation, never again in rebuilds, and compared only when the hashes match.
+    Returns True if all checks pass, and False otherwise.
+    """
+    dic = {}
+    for i in range(size):
+        k = random.choice([str(random.randint(0,size)), (random.randint(0,9), str(random.randint(0,9))), random.randint(0,size) / 4.0])
+        ht[k] = i
+        dic[k] = i
+    ht[1] = "int"
+    ht[1.0] = "float"
+    dic[1] = "float"
+    if ht[1] != "float" or ht[True] != "float": return False
+    for k in list(dic)[:size//4]:
+        del ht[k]
+        del dic[k]
+    if not hashTableCompare(ht, dic) or "missing" in ht: return False
+
+    for k in list(dic):
+        del ht[k]
+    keys = [CountingKey(2 * n) for n in random.sample(xrange(10**9), size)]
+    CountingKey.hashes = CountingKey.compares = 0
+    for k in keys:
+        ht[k] = k.n
+    if CountingKey.hashes != size or CountingKey.compares != 0: return False
+
+    CountingKey.hashes = CountingKey.compares = 0
+    for k in keys:
+        if ht[CountingKey(k.n)] != k.n: return False
+    if CountingKey.hashes != size or CountingKey.compares != size: return False
+
+    CountingKey.compares = 0
+    for k in keys:
+        if CountingKey(k.n + 1) in ht: return False
+    return CountingKey.compares == 0
+
+def hashTableBulkTest(size, cls):
+    """
+    Checks fromItems, update, reserve and shrinkToFit on a hash table class against a dictionary, counting rebuilds,
+    and checks that alternating inserts and deletes around min_load, or right after a grow, do not make the table resize back and forth.
+    (OpenHashTable may still rebuild at the same size to drop tombstones.)
+    Returns True if the contents always match and no unexpected rebuilds happen, and False otherwise.
+    """
+    pairs = [(random.randint(0, 10*size), random.randint(-99999,99999)) for i in range(size)]
+    dic = dict(pairs)
+
+    # loading with a known size allocates the array once
+    ht = cls.fromItems(pairs, expected_size = size)
+    m = ht._m
+    if not hashTableCompare(ht, dic) or sorted(ht.keys()) != sorted(dic.keys()) or m != ht._sizeFor(size): return False
+    ht = cls.fromItems(iter(pairs))
+    if not hashTableCompare(ht, dic) or sorted(ht.keys()) != sorted(dic.keys()): return False
+
+    # update sizes the table once, and accepts dicts and tables
+    rebuilds = []
+    ht = cls()
+    rebuild = ht._rebuild
+    def countingRebuild(new_m):
+        rebuilds.append(new_m)
+        rebuild(new_m)
+    ht._rebuild = countingRebuild
+    ht.update(pairs)
+    if len(rebuilds) != 1 or not hashTableCompare(ht, dic): return False
+    more = dict((k + 1, -v) for k, v in pairs[:size//2])
+    ht.update(more)
+    ht.update(cls.fromItems(more.items()))
+    dic.update(more)
+    if not hashTableCompare(ht, dic) or len(ht.keys()) != len(dic): return False
+
+    # a reservation keeps the table from shrinking, until shrinkToFit
+    del rebuilds[:]
+    ht.reserve(4 * size)
+    m = ht._m
+    for k in list(dic)[:len(dic) - 10]:
+        del ht[k]
+        del dic[k]
+    if ht._m != m or len(rebuilds) > 1 or not hashTableCompare(ht, dic): return False
+    ht.shrinkToFit()
+    if ht._m != ht._sizeFor(len(dic)) or not hashTableCompare(ht, dic): return False
+
+    # hysteresis: once shrunk, alternating deletes and inserts around min_load never resize the table
+    for k in list(dic):
+        del ht[k]
+        del dic[k]
+    keys = random.sample(xrange(10**6), 4 * size)
+    for k in keys:
+        ht[k] = k
+    while len(keys) > 1 and ht.load() >= ht.min_load:
+        k = keys.pop()
+        del ht[k]
+    m = ht._m
+    for i in range(size):
+        ht[-i-1] = i
+        del ht[-i-1]
+        del ht[keys[-1]]
+        ht[keys[-1]] = keys[-1]
+        if ht._m != m: return False
+    if ht._m < ht.min_size: return False
+
+    # a constant count of entries, just past a grow (for OpenHashTable, one done while dropping tombstones), never shrinks back
+    return hashTableSizeChurnTest(int(cls.max_load * 1024) + 1, cls(), 4 * size)
+
 def hashTableCompare(ht, dic):
     """
     Compares all contents of HashTable ht with dictionary dic.
@@ -438,6 +1835,13 @@ def hashTableFullTest():
     print "\nHash function testing:"
     hashFunctionTest()
 
+    print "\nHash function primes and hMany testing:"
+    for i in range(1,21):
+        if hashFunctionPrimeTest(1000):
+            print "Test #",i,"successful"
+        else:
+            print "Test #",i,"failed"
+
     print "\nHash table testing:"
     hashTableTest()
 
@@ -446,6 +1850,34 @@ def hashTableFullTest():
         if hashTableRandomTest(2000):
             print "Test #",i,"successful"
 
+    print "\nGeneric keys and cached hashes testing:"
+    for i in range(1,21):
+        if hashTableGenericKeyTest(1000, HashTable()) and hashTableGenericKeyTest(1000, OpenHashTable()) and hashTableGenericKeyTest(1000, IncrementalHashTable()):
+            print "Test #",i,"successful"
+        else:
+            print "Test #",i,"failed"
+
+    print "\nBulk loading, reserve and shrink policy testing:"
+    for i in range(1,21):
+        if hashTableBulkTest(500, HashTable) and hashTableBulkTest(500, OpenHashTable) and hashTableBulkTest(500, IncrementalHashTable):
+            print "Test #",i,"successful"
+        else:
+            print "Test #",i,"failed"
+
+    print "\nRandom incremental-resize hash table testing:"
+    for i in range(1,21):
+        if hashTableRandomTest(2000, IncrementalHashTable()) and hashTableChurnTest(4000, IncrementalHashTable()) and hashTableResizeTest(3000) and hashTableMigrationTest(3000):
+            print "Test #",i,"successful"
+        else:
+            print "Test #",i,"failed"
+
+    print "\nRandom open-addressing hash table testing:"
+    for i in range(1,21):
+        if hashTableRandomTest(2000, OpenHashTable()) and hashTableChurnTest(4000, OpenHashTable()) and hashTableSizeChurnTest(random.choice([308, 1229, 2458]), OpenHashTable()):
+            print "Test #",i,"successful"
+        else:
+            print "Test #",i,"failed"
+
 def BSTFromArray(arr):
     """
     Creates a BST from the keys in a given array.
@@ -664,6 +2096,7 @@ def AVLFullTest():
     print tree
     
 def main():
+    #keyFunctionTest()
     #heapFullTest()
     #sortedArrayFullTest()
     #hashTableFullTest()